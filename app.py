@@ -1,12 +1,14 @@
-from flask import Flask, request, jsonify                         # >>> ADDED: Flask for REST API
+from flask import Flask, Response, request, jsonify               # >>> ADDED: Flask for REST API
 from flask_cors import CORS                                       # >>> ADDED: Enable CORS for frontend access
-from google import genai
-from google.genai import types
-from sentence_transformers import SentenceTransformer, util
-from docx import Document
-import fitz
+from sentence_transformers import util
 import os
 import pathlib
+from extraction import extraction_cache, extract_text_cached
+from llm_cache import llm_cache, prompt_version
+from llm_backends import Document, make_backend
+from metrics import metrics
+import encoder
+from embeddings import EMBEDDING_POOLING, POOLING_STRATEGIES, EmbeddingCache, encode_documents
 
 # >>> ADDED: Initialize Flask app
 app = Flask(__name__)
@@ -15,40 +17,19 @@ CORS(app)  # >>> ADDED: Allow cross-origin requests for frontend apps
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
 # >>> MOVED: Model and API client initialization outside function so it’s reused
-model = SentenceTransformer("all-mpnet-base-v2")
-genai_client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))  # >>> CHANGED: use a named client object instead of inline
+model = encoder.preload()  # >>> CHANGED: shared, optionally quantized encoder (see encoder.py)
+embedding_cache = EmbeddingCache(encoder.cache_name())  # shared with the ranking apps via EMBEDDING_CACHE_DIR
+llm = make_backend("gemini")  # >>> CHANGED: Gemini behind the shared backend layer (pooling, retries, timeouts)
 
-# >>> MOVED: this helper was unchanged
-def extract_docx(filepath):
-    doc = Document(filepath)
-    text = []
-
-    for para in doc.paragraphs:
-        text.append(para.text)
-
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                text.append(cell.text)
-
-    for section in doc.sections:
-        for para in section.header.paragraphs:
-            text.append(para.text)
-        for para in section.footer.paragraphs:
-            text.append(para.text)
-
-    return "\n".join([t for t in text if t.strip() != ""])
-
-# >>> ADDED: Utility function that combines your PDF and DOCX logic into one
-def extract_text_and_part(filepath):
-    ext = pathlib.Path(filepath).suffix.lower()
+# >>> CHANGED: Utility function that combines your PDF and DOCX logic into one, parsing the upload bytes once
+def extract_text_and_part(filename, data, timings=None):
+    ext = pathlib.Path(filename).suffix.lower()
     if ext == ".pdf":
-        part = types.Part.from_bytes(data=pathlib.Path(filepath).read_bytes(), mime_type="application/pdf")
-        doc = fitz.open(filepath)
-        text = "\n".join(page.get_text() for page in doc)
+        text = extract_text_cached(filename, data, timings)
+        part = Document(text, data, "application/pdf")
     elif ext == ".docx":
-        text = extract_docx(filepath)
-        part = types.Part.from_text(text=text)
+        text = extract_text_cached(filename, data, timings)
+        part = Document(text)
     else:
         raise ValueError("Unsupported file type")
     return text, part
@@ -59,22 +40,27 @@ def score_resume():
     if 'resume' not in request.files or 'job' not in request.files:
         return jsonify({"error": "Missing files"}), 400
 
-    # >>> CHANGED: Save uploaded files to temporary directory (Render safe)
+    pooling = request.form.get("pooling", EMBEDDING_POOLING)
+    if pooling not in POOLING_STRATEGIES:
+        return jsonify({"error": f"pooling must be one of {', '.join(POOLING_STRATEGIES)}"}), 400
+
+    # >>> ADDED: optional per-request stage breakdown (seconds), also recorded on /metrics
+    timings = {} if request.form.get("timings", "").lower() in ("1", "true", "yes") else None
+
+    # >>> CHANGED: Read uploads into memory instead of saving to /tmp (no disk round trip or name collisions)
     resume_file = request.files['resume']
     job_file = request.files['job']
-    resume_path = f"/tmp/{resume_file.filename}"
-    job_path = f"/tmp/{job_file.filename}"
-    resume_file.save(resume_path)
-    job_file.save(job_path)
 
     # >>> CHANGED: Unified file reading for both PDFs and DOCX
-    resume_text, resume_part = extract_text_and_part(resume_path)
-    jd_text, jd_part = extract_text_and_part(job_path)
+    resume_text, resume_part = extract_text_and_part(resume_file.filename, resume_file.read(), timings)
+    jd_text, jd_part = extract_text_and_part(job_file.filename, job_file.read(), timings)
 
-    # >>> UNCHANGED: Use SBERT to encode and compare
-    resume_vec = model.encode(resume_text, convert_to_tensor=True)
-    jd_vec = model.encode(jd_text, convert_to_tensor=True)
-    score = util.cos_sim(resume_vec, jd_vec).item()
+    # >>> CHANGED: Use SBERT to encode and compare, skipping the encoder for previously seen documents
+    # (long documents are chunked and pooled instead of truncated when pooling is enabled)
+    with metrics.timer("encode", timings):
+        resume_vec, jd_vec = encode_documents(model, [resume_text, jd_text], embedding_cache, pooling=pooling)
+    with metrics.timer("similarity", timings):
+        score = util.cos_sim(resume_vec, jd_vec).item()
 
     # >>> UNCHANGED: Prompt with embedded similarity score
     prompt = (
@@ -125,21 +111,45 @@ def score_resume():
 Include the provided SBERT similarity score in your evaluation. """ + str(score)
 )
 
-    # >>> CHANGED: Use shared genai client to call Gemini
-    response = genai_client.models.generate_content(
-        model="gemini-2.0-flash",
-        contents=[resume_part, prompt2, jd_part]
-    )
+    # >>> ADDED: Re-submitting the same resume/JD pair returns the cached assessment instead of calling Gemini again
+    cache_key = llm_cache.key(llm.model, prompt_version(prompt2), resume_text, jd_text)
+    llm_assessment = llm_cache.get(cache_key)
+
+    if llm_assessment is None:
+        # >>> CHANGED: Call Gemini through the shared backend (retries on 429/5xx, per-call timeout)
+        with metrics.timer("llm_calls", timings):
+            llm_assessment = llm.complete([resume_part, prompt2, jd_part])
+        llm_cache.put(cache_key, llm_assessment)
 
     # >>> CHANGED: Return proper API response as JSON
-    return jsonify({
+    response = {
         "sbert_score": round(score, 3),
-        "llm_assessment": response.text
+        "llm_assessment": llm_assessment
+    }
+    if timings is not None:
+        response["timings"] = timings
+    return jsonify(response)
+
+@app.route('/cache_stats')
+def cache_stats():  # >>> ADDED: hit/miss counters for sizing the caches
+    return jsonify({
+        "extraction": extraction_cache.stats(),
+        "embeddings": embedding_cache.stats(),
+        "llm": llm_cache.stats(),
+        "llm_backend": llm.stats()
     })
 
+@app.route('/metrics')
+def prometheus_metrics():  # >>> ADDED: stage timers, document/token counters and cache stats for Prometheus
+    return Response(metrics.render(
+        cache={"extraction": extraction_cache.stats(), "embeddings": embedding_cache.stats(), "llm": llm_cache.stats()},
+        llm_backend={llm.name: llm.stats()},
+    ), mimetype="text/plain; version=0.0.4")
+
 @app.route('/')
-def home():
-    return 'Resume Fitment API is live!'
+def home(): #health check; 503 until the encoder is loaded and warmed up
+    status = encoder.status()
+    return jsonify(dict(status, message='Resume Fitment API is live!')), 200 if status["ready"] else 503
 
 # >>> CHANGED: Set host and port for Render compatibility
 if __name__ == '__main__':
@@ -0,0 +1,287 @@
+"""End-to-end screening benchmark on synthetic resumes.
+
+    python benchmark.py --resumes 50 --words 800 --formats pdf,docx,doc --repeat 3
+
+Covers extraction (extract_text_and_part, extract_docx), SBERT encoding, similarity scoring and the
+full /score_resumes_ranked request with the fake LLM backend. Prints per-stage latency percentiles,
+throughput and peak RSS, and appends the run to BENCH_OUTPUT so runs can be compared over time.
+"""
+import argparse
+import importlib
+import io
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_OUTPUT = os.environ.get("BENCH_OUTPUT", "benchmark_results.jsonl")
+
+SKILLS = [
+    "Python", "Java", "SQL", "Spark", "Airflow", "Kafka", "AWS", "Azure", "GCP", "Docker", "Kubernetes",
+    "Terraform", "React", "Node.js", "Flask", "Django", "Pandas", "TensorFlow", "PyTorch", "Tableau",
+    "Power BI", "Snowflake", "Databricks", "Jenkins", "Git", "Linux", "REST APIs", "Microservices",
+]
+FILLER = (
+    "designed built delivered maintained migrated optimised automated led mentored reviewed tested deployed "
+    "scalable reliable pipelines services dashboards platform clients stakeholders requirements production "
+    "performance data reporting analytics banking retail insurance healthcare telecom team project quarterly"
+).split()
+
+
+def synthetic_resume(rng, words):
+    """Sectioned resume text of roughly `words` words; returns (title, [(heading, paragraphs)], skills)."""
+    skills = rng.sample(SKILLS, 8)
+    sections = []
+    for heading, share in (("Summary", 0.1), ("Experience", 0.6), ("Projects", 0.2), ("Education", 0.1)):
+        paragraphs = []
+        for _ in range(max(1, int(words * share) // 60)):
+            paragraphs.append(" ".join(rng.choice(FILLER + skills) for _ in range(60)).capitalize() + ".")
+        sections.append((heading, paragraphs))
+    return f"Candidate {rng.randrange(10 ** 6)}", sections, skills
+
+
+def as_text(title, sections, skills):
+    lines = [title]
+    for heading, paragraphs in sections:
+        lines += [heading] + paragraphs
+    return "\n".join(lines + ["Skills", ", ".join(skills)])
+
+
+def make_pdf(title, sections, skills):
+    import fitz
+
+    doc = fitz.open()
+    lines = as_text(title, sections, skills).split("\n")
+    for start in range(0, len(lines), 8):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 545, 790), "\n".join(lines[start:start + 8]), fontsize=9)
+    return doc.tobytes()
+
+
+def make_docx(title, sections, skills):
+    import docx
+
+    doc = docx.Document()
+    doc.add_heading(title, 0)
+    for heading, paragraphs in sections:
+        doc.add_heading(heading, 1)
+        for paragraph in paragraphs:
+            doc.add_paragraph(paragraph)
+    table = doc.add_table(rows=len(skills), cols=2)
+    for row, skill in zip(table.rows, skills):
+        row.cells[0].text = skill
+        row.cells[1].text = "Proficient"
+    buf = io.BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+def make_doc(title, sections, skills):
+    # Legacy .doc uploads are frequently RTF saved under a .doc name
+    body = as_text(title, sections, skills).replace("\\", "\\\\").replace("{", "\\{").replace("}", "\\}")
+    return ("{\\rtf1\\ansi\\deff0 " + body.replace("\n", "\\par\n") + "}").encode("utf-8")
+
+
+MAKERS = {"pdf": make_pdf, "docx": make_docx, "doc": make_doc}
+
+
+def build_corpus(n, words, formats, seed):
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(n):
+        fmt = formats[i % len(formats)]
+        corpus.append((f"resume_{seed}_{i}.{fmt}", MAKERS[fmt](*synthetic_resume(rng, words))))
+    jd = as_text("Job Description: Senior Data Engineer", [("Responsibilities", [" ".join(rng.choice(FILLER + SKILLS) for _ in range(150))])], rng.sample(SKILLS, 10))
+    return corpus, ("job_description.pdf", make_pdf("Job Description", [("Role", [jd])], []))
+
+
+def summarize(latencies, items=None):
+    import numpy as np
+
+    values = np.array(latencies) * 1000
+    total = float(np.sum(latencies))
+    stats = {"n": len(latencies), "mean_ms": round(float(values.mean()), 3)}
+    for p in (50, 90, 95, 99):
+        stats[f"p{p}_ms"] = round(float(np.percentile(values, p)), 3)
+    if items:
+        stats["items_per_sec"] = round(items / total, 2) if total else None
+    stats["peak_rss_mb"] = peak_rss_mb()
+    return stats
+
+
+def peak_rss_mb():
+    # Includes the extraction pool's worker processes; ru_maxrss is in KiB on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round((own + children) / scale, 1)
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def reset_caches():
+    # Every repeat measures cold caches unless --warm is given
+    import extraction
+    import routes
+    from cache import LRUCache
+    from embeddings import EmbeddingCache
+    from llm_cache import llm_cache
+
+    extraction.extraction_cache = extraction.ExtractionCache(cache_dir=None)
+    routes.embedding_cache = EmbeddingCache(routes.embedding_cache.model_name, cache_dir=None)
+    llm_cache.memory = LRUCache(llm_cache.memory.max_items, ttl=llm_cache.memory.ttl)
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ.setdefault("LLM_FAKE_LATENCY", str(args.llm_latency))
+    os.environ["EMBEDDING_CACHE_DIR"] = os.path.join(workdir, "embeddings")
+    os.environ["JOB_DB_PATH"] = os.path.join(workdir, "jobs.sqlite3")
+    os.environ["VECTOR_INDEX_DIR"] = os.path.join(workdir, "index")
+
+    import numpy as np
+    from sentence_transformers import util
+
+    from embeddings import encode_documents, encode_texts
+    from extraction import extract_docx, extract_docx_xml, extract_text
+
+    app = importlib.import_module(args.app)
+    import routes  # the model and caches the app's routes use
+    client = app.app.test_client()
+    formats = args.formats.split(",")
+    stages = {}
+
+    def record(stage, latencies, items=None):
+        stages[stage] = summarize(latencies, items)
+        print(f"{stage:<28} " + "  ".join(f"{k}={v}" for k, v in stages[stage].items()), flush=True)
+
+    corpora = [build_corpus(args.resumes, args.words, formats, args.seed + r) for r in range(args.repeat)]
+
+    # Extraction: the app's own helper (cache cleared, so the parsers run) and the raw parsers
+    latencies = []
+    for corpus, _ in corpora:
+        if not args.warm:
+            reset_caches()
+        for filename, data in corpus:
+            if filename.endswith(".doc") and args.app == "multi_upload_app":
+                continue  # that app only accepts PDF/DOCX job descriptions through this helper
+            latencies.append(timed(app.extract_text_and_part, filename, data)[0])
+    record("extract_text_and_part", latencies, len(latencies))
+
+    for fmt in formats:
+        docs = [(f, d) for corpus, _ in corpora for f, d in corpus if f.endswith("." + fmt)]
+        if fmt == "docx":
+            # The streaming XML reader against the python-docx fallback, on the same files
+            for name, parse in (("extract_docx[xml]", extract_docx_xml), ("extract_docx[python-docx]", extract_docx)):
+                record(name, [timed(parse, io.BytesIO(d))[0] for _, d in docs], len(docs))
+            continue
+        record(f"extract_text[{fmt}]", [timed(extract_text, f, d)[0] for f, d in docs], len(docs))
+
+    # SBERT encoding of whole batches (no cache), and the similarity matrix on the result
+    texts = [extract_text(f, d) for f, d in corpora[0][0]]
+    jd_text = extract_text(*corpora[0][1])
+    encode_latencies, vecs = [], None
+    for _ in range(args.repeat):
+        elapsed, vecs = timed(encode_texts, routes.model, [jd_text] + texts, None, args.batch_size)
+        encode_latencies.append(elapsed)
+    record("sbert_encode", encode_latencies, len(texts) * args.repeat + args.repeat)
+
+    if args.pooling != "none":
+        record(f"sbert_encode[{args.pooling}]", [timed(encode_documents, routes.model, [jd_text] + texts, None, args.batch_size, args.pooling)[0]
+                                                 for _ in range(args.repeat)], (len(texts) + 1) * args.repeat)
+
+    record("similarity", [timed(lambda: util.cos_sim(vecs[:1], vecs[1:])[0].tolist())[0] for _ in range(args.repeat * 20)])
+
+    # Full request path, fake LLM; items are resumes screened per second
+    latencies, screened = [], 0
+    for corpus, (jd_name, jd_data) in corpora:
+        if not args.warm:
+            reset_caches()
+        for start in range(0, len(corpus), args.request_size):
+            batch = corpus[start:start + args.request_size]
+            data = {
+                "job": (io.BytesIO(jd_data), jd_name),
+                "resumes": [(io.BytesIO(d), f) for f, d in batch],
+                "shard_size": str(args.shard_size),
+                "pooling": args.pooling,
+            }
+            elapsed, response = timed(client.post, "/score_resumes_ranked", data=data, content_type="multipart/form-data")
+            if response.status_code != 200:
+                raise SystemExit(f"/score_resumes_ranked returned {response.status_code}: {response.get_data(as_text=True)[:500]}")
+            latencies.append(elapsed)
+            screened += len(batch)
+    record("score_resumes_ranked", latencies, screened)
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "stages": stages,
+        "peak_rss_mb": peak_rss_mb(),
+        "numpy": np.__version__,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, current):
+    """Print the p50 change of every stage against the last saved run with the same config."""
+    print(f"\nvs {previous['commit']} ({previous['timestamp']}):")
+    for stage, stats in current["stages"].items():
+        before = previous["stages"].get(stage)
+        if before and before["p50_ms"]:
+            change = (stats["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100
+            print(f"  {stage:<28} p50 {before['p50_ms']:>10.3f} -> {stats['p50_ms']:>10.3f} ms ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default="multiv2", choices=("multiv2", "multi_upload_app"))
+    parser.add_argument("--resumes", type=int, default=30, help="synthetic resumes per repeat")
+    parser.add_argument("--words", type=int, default=600, help="approximate words per resume")
+    parser.add_argument("--formats", default="pdf,docx,doc")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--request-size", type=int, default=10, help="resumes per /score_resumes_ranked call")
+    parser.add_argument("--shard-size", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--pooling", default="none")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds the fake LLM sleeps per call")
+    parser.add_argument("--warm", action="store_true", help="keep caches between repeats")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=BENCH_OUTPUT)
+    parser.add_argument("--compare", action="store_true", help="compare with the last saved run with the same config")
+    args = parser.parse_args()
+
+    result = run(args)
+
+    previous = None
+    if args.compare and os.path.exists(args.output):
+        with open(args.output) as f:
+            runs = [json.loads(line) for line in f if line.strip()]
+        previous = next((r for r in reversed(runs) if r["config"] == result["config"]), None)
+    with open(args.output, "a") as f:
+        f.write(json.dumps(result) + "\n")
+    print(f"\nSaved to {args.output}")
+    if previous:
+        compare(previous, result)
+
+
+if __name__ == "__main__":
+    main()
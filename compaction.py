@@ -0,0 +1,105 @@
+import os
+import re
+import unicodedata
+
+import numpy as np
+
+from embeddings import _section_of, chunk_text, encode_texts
+
+# Resume text is compacted before it goes into an LLM prompt: whitespace collapsed, repeated lines
+# (DOCX headers/footers, PDF page furniture) dropped, contact details and boilerplate sections
+# removed. Optionally each resume is capped to the chunks most similar to the JD. Off unless
+# PROMPT_COMPACTION (or the per-request compact option) turns it on.
+PROMPT_COMPACTION = os.environ.get("PROMPT_COMPACTION", "0").lower() in ("1", "true", "yes")
+PROMPT_MAX_RESUME_WORDS = int(os.environ.get("PROMPT_MAX_RESUME_WORDS", 0))  # 0 = no cap
+PROMPT_CHUNK_WORDS = int(os.environ.get("PROMPT_CHUNK_WORDS", 80))
+
+EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+URL = re.compile(r"\b(?:https?://|www\.|(?:linkedin|github)\.com/)\S*", re.IGNORECASE)
+PHONE = re.compile(r"\+?\(?\d[\d ().-]{8,}\d")
+BOILERPLATE = re.compile(
+    r"^(?:page \d+(?: of \d+)?|curriculum vitae|resume|cv|references available (?:up)?on request\.?"
+    r"|i hereby declare\b.*|date:.*|place:.*)$",
+    re.IGNORECASE,
+)
+
+
+def _looks_like_heading(line):
+    # Short, unpunctuated and set apart by case or a trailing colon: "ACHIEVEMENTS", "Languages:"
+    words = line.rstrip(":").split()
+    if not words or len(words) > 4 or re.search(r"[.,;@\d]", line):
+        return False
+    return line.isupper() or line.endswith(":") or all(w[0].isupper() or w in ("&", "and", "of") for w in words)
+
+
+def estimate_tokens(text):
+    # ~4 characters per token for English prose; used where the provider's tokenizer isn't available
+    return len(text or "") // 4
+
+
+def compact_text(text):
+    """Whitespace-collapsed, de-duplicated resume text without contact details or boilerplate sections."""
+    text = unicodedata.normalize("NFKC", text or "")
+    lines = []
+    seen = set()
+    skipping = False
+    for line in text.splitlines():
+        line = re.sub(r"\s+", " ", line).strip(" \t•·▪◦-*|")
+        if not line:
+            continue
+        section = _section_of(line)
+        if section is not None:
+            skipping = section == "personal"  # contact/personal details, declaration, hobbies, references
+        elif skipping and _looks_like_heading(line):
+            skipping = False  # a section SECTION_HEADINGS doesn't know, e.g. "Achievements"
+        if skipping or BOILERPLATE.match(line):
+            continue
+        line = URL.sub("", EMAIL.sub("", line))
+        # Ten or more digits is a phone number; shorter runs are dates ("2015 - 2019") and the like
+        line = PHONE.sub(lambda m: "" if sum(ch.isdigit() for ch in m.group()) >= 10 else m.group(), line)
+        line = re.sub(r"\s+", " ", line).strip(" ,;:|/-")
+        key = line.lower()
+        if len(key) < 2 or key in seen:
+            continue
+        seen.add(key)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _top_chunks(chunks, chunk_vecs, jd_vec, max_words):
+    # Highest-similarity chunks until the word budget is spent, kept in document order
+    scores = chunk_vecs @ jd_vec / np.maximum(np.linalg.norm(chunk_vecs, axis=1) * np.linalg.norm(jd_vec), 1e-12)
+    chosen, words = [], 0
+    for i in np.argsort(-scores):
+        size = len(chunks[i].split())
+        if chosen and words + size > max_words:
+            continue
+        chosen.append(i)
+        words += size
+    return "\n...\n".join(chunks[i] for i in sorted(chosen))
+
+
+def compact_candidates(model, cache, jd_vec, candidates, max_words=PROMPT_MAX_RESUME_WORDS,
+                       chunk_words=PROMPT_CHUNK_WORDS, batch_size=32):
+    """Set c["prompt_text"] on every candidate and return {"before", "after"} estimated prompt tokens.
+
+    With max_words > 0, resumes longer than that keep only their chunks most similar to the JD
+    (all chunks of all candidates are encoded in one batch).
+    """
+    before = 0
+    to_cap = []
+    for c in candidates:
+        before += estimate_tokens(c["resume_text"])
+        c["prompt_text"] = compact_text(c["resume_text"])
+        if max_words > 0 and len(c["prompt_text"].split()) > max_words:
+            to_cap.append((c, [chunk for chunk, _ in chunk_text(c["prompt_text"], chunk_words, 0)]))
+
+    if to_cap:
+        vecs = encode_texts(model, [chunk for _, chunks in to_cap for chunk in chunks], cache, batch_size)
+        start = 0
+        for c, chunks in to_cap:
+            c["prompt_text"] = _top_chunks(chunks, vecs[start:start + len(chunks)], np.asarray(jd_vec, dtype=np.float32), max_words)
+            start += len(chunks)
+
+    after = sum(estimate_tokens(c["prompt_text"]) for c in candidates)
+    return {"before": before, "after": after}
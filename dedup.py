@@ -0,0 +1,95 @@
+import os
+import re
+import zlib
+
+import numpy as np
+
+# Bulk uploads often hold the same candidate several times (re-exports, PDF + DOCX, small edits).
+# Duplicates are collapsed before scoring so each candidate is encoded and assessed once: exact
+# matches by normalized-text hash, near matches by MinHash similarity of word shingles.
+DEDUP_ENABLED = os.environ.get("DEDUP_ENABLED", "1").lower() in ("1", "true", "yes")
+DEDUP_THRESHOLD = float(os.environ.get("DEDUP_THRESHOLD", 0.85))  # estimated Jaccard similarity
+MINHASH_PERMUTATIONS = 128
+MINHASH_BANDS = 32  # LSH: documents sharing any band of MINHASH_PERMUTATIONS / MINHASH_BANDS rows are compared
+SHINGLE_WORDS = 5
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(0)
+_A = _rng.integers(1, _PRIME, MINHASH_PERMUTATIONS, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+def shingles(text, size=SHINGLE_WORDS):
+    words = re.findall(r"\w+", (text or "").lower())
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(text):
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode("utf-8")) % _PRIME for s in shingles(text)),
+        dtype=np.uint64,
+    )
+    # (a * x + b) mod p stays below 2**62 for 31-bit x, a and b, so uint64 never overflows
+    return ((hashes[:, None] * _A + _B) % _PRIME).min(axis=0)
+
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        i, j = self.find(i), self.find(j)
+        if i != j:
+            self.parent[max(i, j)] = min(i, j)  # the earliest upload stays the representative
+
+
+def duplicate_groups(keys, texts, threshold=DEDUP_THRESHOLD):
+    """Group indices of identical keys (e.g. content hashes) and near-duplicate texts.
+
+    Returns a list of index groups in input order; the first index of each group is its representative.
+    """
+    uf = _UnionFind(len(texts))
+    first = {}
+    for i, key in enumerate(keys):
+        uf.union(first.setdefault(key, i), i)
+
+    unique = [i for i in range(len(texts)) if first[keys[i]] == i]
+    if threshold < 1 and len(unique) > 1:
+        signatures = np.stack([minhash(texts[i]) for i in unique])
+        rows = MINHASH_PERMUTATIONS // MINHASH_BANDS
+        compared = set()
+        for band in range(MINHASH_BANDS):
+            buckets = {}
+            for pos, signature in enumerate(signatures[:, band * rows:(band + 1) * rows]):
+                buckets.setdefault(signature.tobytes(), []).append(pos)
+            for members in buckets.values():
+                for a in members:
+                    for b in members:
+                        if a < b and (a, b) not in compared:
+                            compared.add((a, b))
+                            if np.mean(signatures[a] == signatures[b]) >= threshold:
+                                uf.union(unique[a], unique[b])
+
+    groups = {}
+    for i in range(len(texts)):
+        groups.setdefault(uf.find(i), []).append(i)
+    return list(groups.values())
+
+
+def collapse_duplicates(candidates, threshold=DEDUP_THRESHOLD):
+    """Keep one candidate per duplicate group, listing the others' resume names under "aliases"."""
+    groups = duplicate_groups([c["candidate_id"] for c in candidates], [c["resume_text"] for c in candidates], threshold)
+    kept = []
+    for group in groups:
+        representative = candidates[group[0]]
+        representative["aliases"] = [candidates[i]["resume_name"] for i in group[1:]]
+        kept.append(representative)
+    return kept
@@ -0,0 +1,307 @@
+import fcntl
+import hashlib
+import os
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+
+from cache import LRUCache
+
+EMBEDDING_CACHE_DIR = os.environ.get("EMBEDDING_CACHE_DIR", "/tmp/embedding_cache")
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", 4096))
+EMBEDDING_DISK_MAX_ITEMS = int(os.environ.get("EMBEDDING_DISK_MAX_ITEMS", 100_000))  # per generation; 0 = unbounded
+SBERT_BATCH_SIZE = int(os.environ.get("SBERT_BATCH_SIZE", 32))
+
+# Long-document mode: "none" encodes the whole text (truncated at the model's max sequence length),
+# otherwise the text is split into overlapping word windows whose embeddings are pooled
+POOLING_STRATEGIES = ("none", "mean", "max", "section")
+EMBEDDING_POOLING = os.environ.get("EMBEDDING_POOLING", "none")
+CHUNK_WORDS = int(os.environ.get("EMBEDDING_CHUNK_WORDS", 200))  # ~300 tokens, inside mpnet's 384 limit
+CHUNK_OVERLAP = int(os.environ.get("EMBEDDING_CHUNK_OVERLAP", 50))
+
+SECTION_HEADINGS = {
+    "skills": ("skills", "technical skills", "key skills", "skills summary", "core competencies", "technologies",
+               "tech stack", "tools"),
+    "experience": ("experience", "work experience", "professional experience", "relevant experience", "employment",
+                   "employment history", "work history", "career history"),
+    "projects": ("projects", "key projects", "personal projects", "academic projects"),
+    "requirements": ("requirements", "key requirements", "responsibilities", "key responsibilities", "required skills",
+                     "must have", "nice to have", "what you will do", "qualifications", "preferred qualifications"),
+    "summary": ("summary", "professional summary", "profile", "professional profile", "objective", "career objective",
+                "about me", "about the role"),
+    "education": ("education", "academic", "academic qualifications", "certifications", "certificates"),
+    "personal": ("personal details", "personal information", "contact", "contact details", "contact information",
+                 "declaration", "hobbies", "interests", "hobbies and interests", "references"),
+}
+_HEADING_SECTIONS = {name: section for section, names in SECTION_HEADINGS.items() for name in names}
+SECTION_WEIGHTS = {
+    "skills": 1.5,
+    "experience": 1.5,
+    "requirements": 1.5,
+    "projects": 1.2,
+    "summary": 1.0,
+    "other": 1.0,
+    "education": 0.8,
+    "personal": 0.2,
+}
+
+
+def normalize_text(text):
+    # Whitespace-only differences (re-exports, trailing newlines) map to the same embedding
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def text_key(text, model_name):
+    return hashlib.sha256(f"{model_name}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+def _section_of(line):
+    # Only a whole line naming a known section counts, optionally followed by ":" ("Work Experience:");
+    # content that merely starts with one ("Contactless payments platform") is not a heading
+    heading = re.sub(r"\s+", " ", line.replace("&", " and ")).strip(" \t#*•·▪◦|-").rstrip(":").strip().lower()
+    return _HEADING_SECTIONS.get(heading)
+
+
+def chunk_text(text, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """Split text into overlapping word windows, returning (chunk, section) pairs."""
+    words, sections = [], []
+    section = "other"
+    for line in (text or "").splitlines():
+        section = _section_of(line) or section
+        for word in line.split():
+            words.append(word)
+            sections.append(section)
+
+    step = max(chunk_words - overlap, 1)
+    chunks = []
+    for start in range(0, max(len(words), 1), step):
+        window = slice(start, start + chunk_words)
+        section = Counter(sections[window]).most_common(1)[0][0] if sections else "other"
+        chunks.append((" ".join(words[window]), section))
+        if start + chunk_words >= len(words):
+            break
+    return chunks
+
+
+def pool_chunks(vecs, sections, strategy):
+    vecs = vecs / np.maximum(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12)
+    if strategy == "max":
+        return vecs.max(axis=0)
+    if strategy == "section":
+        weights = np.array([SECTION_WEIGHTS.get(s, 1.0) for s in sections], dtype=np.float32)[:, None]
+        return (vecs * weights).sum(axis=0) / weights.sum()
+    return vecs.mean(axis=0)
+
+
+class _Generation:
+    # One append-only vector file + index file pair of a DiskVectorStore
+    def __init__(self, directory, number, dim):
+        suffix = f".{number}" if number else ""  # generation 0 keeps the original file names
+        self.number = number
+        self.vectors_path = os.path.join(directory, f"vectors{suffix}.f16")
+        self.index_path = os.path.join(directory, f"index{suffix}.tsv")
+        self.dim = dim
+        self.rows = {}
+        self._index_offset = 0
+        self._mmap = None
+
+    def refresh(self):
+        try:
+            f = open(self.index_path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return  # not written yet, or just retired by another process
+        with f:
+            f.seek(self._index_offset)
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # partially written line, picked up on the next refresh
+                self._index_offset += len(line.encode("utf-8"))
+                key, row, dim = line.rstrip("\n").split("\t")
+                self.rows[key] = int(row)
+                self.dim = self.dim or int(dim)
+
+    def read(self, row):
+        n_rows = os.path.getsize(self.vectors_path) // (2 * self.dim)
+        if self._mmap is None or row >= self._mmap.shape[0]:
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float16, mode="r", shape=(n_rows, self.dim))
+        return np.asarray(self._mmap[row], dtype=np.float32)
+
+    def append(self, key, vec):
+        # Caller holds the store's file lock
+        self.dim = self.dim or vec.shape[0]
+        with open(self.vectors_path, "ab") as f:
+            row = f.tell() // (2 * self.dim)
+            f.write(vec.tobytes())
+        with open(self.index_path, "a", encoding="utf-8") as index:
+            index.write(f"{key}\t{row}\t{self.dim}\n")
+        self.rows[key] = row
+
+
+class DiskVectorStore:
+    """Append-only float16 vector files (memory-mapped for reads) plus key -> row indexes, kept in
+    two generations so the store stays bounded.
+
+    Rows are appended to the current generation under an exclusive file lock so several worker
+    processes can share one store; each process picks up rows written by the others on its next
+    miss. When the current generation holds max_items rows a new one is started and the one before
+    it is deleted, so disk use and every process's index stay under 2 * max_items rows. A hit in
+    the previous generation is copied into the current one, so entries still in use survive.
+    """
+
+    def __init__(self, directory, dim=None, max_items=EMBEDDING_DISK_MAX_ITEMS):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.lock_path = os.path.join(directory, "lock")
+        self.dim = dim
+        self.max_items = max_items
+        self._generations = []  # current first, then the previous one
+        self._lock = threading.Lock()
+        with self._lock:
+            self._sync()
+
+    def _sync(self):
+        # Follow rotations done by other processes, then pick up their new rows
+        numbers = sorted(
+            (int(m.group(1) or 0) for m in map(re.compile(r"index(?:\.(\d+))?\.tsv$").match, os.listdir(self.directory)) if m),
+            reverse=True,
+        )[:2] or [0]
+        known = {g.number: g for g in self._generations}
+        self._generations = [known.get(n) or _Generation(self.directory, n, self.dim) for n in numbers]
+        for generation in self._generations:
+            generation.refresh()
+            self.dim = self.dim or generation.dim
+
+    def _find(self, key):
+        for generation in self._generations:
+            if key in generation.rows:
+                return generation
+        return None
+
+    def get(self, key):
+        with self._lock:
+            generation = self._find(key)
+            if generation is None:
+                self._sync()
+                generation = self._find(key)
+            if generation is None:
+                return None
+            try:
+                vec = generation.read(generation.rows[key])
+            except FileNotFoundError:
+                return None  # retired by another process since the last sync
+        if generation is not self._generations[0]:
+            self.put(key, vec)  # still in use: carry it into the current generation
+        return vec
+
+    def put(self, key, vec):
+        vec = np.asarray(vec, dtype=np.float16).reshape(-1)
+        with self._lock, open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._sync()
+                current = self._generations[0]
+                if key in current.rows:
+                    return
+                if self.max_items and len(current.rows) >= self.max_items:
+                    current = self._rotate()
+                current.append(key, vec)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _rotate(self):
+        # Caller holds the file lock: start a new generation and delete the oldest one
+        current = _Generation(self.directory, self._generations[0].number + 1, self.dim)
+        for retired in self._generations[1:]:
+            for path in (retired.index_path, retired.vectors_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        self._generations = [current, self._generations[0]]
+        return current
+
+    def __len__(self):
+        return sum(len(g.rows) for g in self._generations)
+
+
+class EmbeddingCache:
+    """Embeddings keyed by a hash of the normalized text: in-memory LRU in front of a disk store."""
+
+    def __init__(self, model_name, max_items=EMBEDDING_CACHE_SIZE, cache_dir=EMBEDDING_CACHE_DIR):
+        self.model_name = model_name
+        self.memory = LRUCache(max_items)
+        self.disk = DiskVectorStore(os.path.join(cache_dir, re.sub(r"\W", "_", model_name))) if cache_dir else None
+
+    def key(self, text):
+        return text_key(text, self.model_name)
+
+    def get(self, key):
+        vec = self.memory.get(key)
+        if vec is None and self.disk is not None:
+            vec = self.disk.get(key)
+            if vec is not None:
+                self.memory.put(key, vec)
+        return vec
+
+    def put(self, key, vec):
+        vec = np.asarray(vec, dtype=np.float32)
+        self.memory.put(key, vec)
+        if self.disk is not None:
+            self.disk.put(key, vec)
+
+    def stats(self):
+        stats = self.memory.stats()
+        stats["disk_items"] = len(self.disk) if self.disk is not None else 0
+        return stats
+
+
+def encode_texts(model, texts, cache=None, batch_size=32):
+    """Encode texts as an (n, dim) float32 array, sending only cache misses through the model in one batch."""
+    if not texts:
+        return np.zeros((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+    if cache is None:
+        return model.encode(list(texts), batch_size=batch_size, convert_to_numpy=True)
+
+    keys = [cache.key(t) for t in texts]
+    vecs = {}
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key in vecs or key in missing:
+            continue
+        vec = cache.get(key)
+        if vec is None:
+            missing[key] = text
+        else:
+            vecs[key] = vec
+
+    if missing:
+        encoded = model.encode(list(missing.values()), batch_size=batch_size, convert_to_numpy=True)
+        for key, vec in zip(missing, encoded):
+            cache.put(key, vec)
+            vecs[key] = vec
+
+    return np.stack([vecs[k] for k in keys]).astype(np.float32)
+
+
+def encode_documents(model, texts, cache=None, batch_size=32, pooling=EMBEDDING_POOLING,
+                     chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """Encode whole documents; with pooling enabled every chunk of every document goes through one batch."""
+    if pooling not in POOLING_STRATEGIES:
+        raise ValueError(f"Unsupported pooling strategy: {pooling}")
+    if pooling == "none":
+        return encode_texts(model, texts, cache, batch_size)
+
+    doc_chunks = [chunk_text(t, chunk_words, overlap) for t in texts]
+    chunk_vecs = encode_texts(model, [c for chunks in doc_chunks for c, _ in chunks], cache, batch_size)
+
+    pooled = []
+    start = 0
+    for chunks in doc_chunks:
+        end = start + len(chunks)
+        pooled.append(pool_chunks(chunk_vecs[start:end], [s for _, s in chunks], pooling))
+        start = end
+    if not pooled:
+        return chunk_vecs
+    return np.stack(pooled).astype(np.float32)
@@ -0,0 +1,85 @@
+import logging
+import os
+import threading
+import time
+
+from sentence_transformers import SentenceTransformer
+
+# One SentenceTransformer per process, built on first use. Under gunicorn with preload_app
+# (see gunicorn.conf.py) it is built once in the master and shared copy-on-write by the workers.
+SBERT_MODEL = os.environ.get("SBERT_MODEL", "all-mpnet-base-v2")
+SBERT_BACKENDS = ("torch", "int8", "onnx")
+SBERT_BACKEND = os.environ.get("SBERT_BACKEND", "torch")  # int8 = dynamic-quantized Linear layers, CPU only
+SBERT_WARMUP = os.environ.get("SBERT_WARMUP", "import")  # import | fork (after the worker forks) | off
+
+WARMUP_TEXTS = [
+    "Senior Python developer with experience in Flask, REST APIs, SQL and cloud deployments.",
+    " ".join(["Job description: we are hiring a data engineer to build pipelines with Spark and Airflow."] * 20),
+]
+
+log = logging.getLogger(__name__)
+
+_model = None
+_lock = threading.Lock()
+_status = {"ready": False, "model": SBERT_MODEL, "backend": None, "load_seconds": None, "warmup_seconds": None, "error": None}
+
+
+def cache_name():
+    # Quantized/ONNX vectors differ slightly from the torch ones, so they get their own embedding cache entries
+    return SBERT_MODEL if _status["backend"] in (None, "torch") else f"{SBERT_MODEL}:{_status['backend']}"
+
+
+def load_model(name=SBERT_MODEL, backend=SBERT_BACKEND):
+    """Build the encoder for the requested backend, falling back to plain torch if it is unavailable."""
+    if backend not in SBERT_BACKENDS:
+        raise ValueError(f"SBERT_BACKEND must be one of {', '.join(SBERT_BACKENDS)}")
+    if backend == "onnx":
+        try:
+            return SentenceTransformer(name, device="cpu", backend="onnx"), "onnx"
+        except Exception as e:  # optimum/onnxruntime missing or an older sentence-transformers
+            log.warning("ONNX encoder unavailable (%s); using torch", e)
+            backend = "torch"
+
+    if backend == "int8":
+        import torch
+
+        model = SentenceTransformer(name, device="cpu")
+        torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        return model, "int8"
+    return SentenceTransformer(name), "torch"
+
+
+def get_model():
+    global _model
+    with _lock:
+        if _model is None:
+            started = time.perf_counter()
+            _model, _status["backend"] = load_model()
+            _status["load_seconds"] = round(time.perf_counter() - started, 3)
+            _status["ready"] = SBERT_WARMUP == "off"
+    return _model
+
+
+def warm_up():
+    """Run a throwaway batch so the first real request doesn't pay for lazy initialisation."""
+    model = get_model()
+    started = time.perf_counter()
+    try:
+        model.encode(WARMUP_TEXTS, convert_to_numpy=True)
+    except Exception as e:
+        _status["error"] = f"Warm-up failed: {e}"
+        return
+    _status["warmup_seconds"] = round(time.perf_counter() - started, 3)
+    _status["ready"] = True
+
+
+def preload():
+    """Load the shared model at import time; warm it up now unless that is deferred to the forked workers."""
+    model = get_model()
+    if SBERT_WARMUP == "import":
+        warm_up()
+    return model
+
+
+def status():
+    return dict(_status)
@@ -0,0 +1,447 @@
+from docx import Document
+import fitz
+import gzip
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import pathlib
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+import zipfile
+
+from cache import LRUCache
+from legacy_doc import extract_legacy_doc
+from metrics import metrics
+
+# Uploads are parsed straight from their bytes (no /tmp round trip). Resume extraction fans out
+# over a process pool so PyMuPDF and the DOCX/.doc readers run on every core and a corrupt or hanging file only costs its own slot
+EXTRACT_WORKERS = int(os.environ.get("EXTRACT_WORKERS", os.cpu_count() or 1))
+EXTRACT_TIMEOUT = float(os.environ.get("EXTRACT_TIMEOUT", 30))  # seconds per file
+EXTRACT_MAX_TASKS = int(os.environ.get("EXTRACT_MAX_TASKS", 200))  # recycle workers to cap native-library leaks
+EXTRACT_START_METHOD = os.environ.get("EXTRACT_START_METHOD", "fork")
+
+# PDFs are read one page at a time (each page released before the next is loaded) and at most
+# PDF_MAX_PAGES pages are read, so oversized portfolio-style uploads have bounded cost. PDFs longer
+# than PDF_PAGES_PER_TASK pages are split into page ranges extracted on several pool workers.
+#   columns - text blocks in reading order, two-column layouts read column by column
+#   plain   - PyMuPDF's default text order
+PDF_LAYOUTS = ("columns", "plain")
+PDF_LAYOUT = os.environ.get("PDF_LAYOUT", "columns")
+PDF_MAX_PAGES = int(os.environ.get("PDF_MAX_PAGES", 20))  # 0 = no cap
+PDF_PAGES_PER_TASK = int(os.environ.get("PDF_PAGES_PER_TASK", 8))
+COLUMN_MIN_CHARS = 200  # both sides need this much text before a page region is read as two columns
+
+# Extracted text is cached by the SHA-256 of the uploaded bytes so re-uploads skip the parsers entirely.
+# Bump EXTRACTOR_VERSION whenever extraction output changes so stale entries are not reused.
+EXTRACTOR_VERSION = "5"
+EXTRACTION_CACHE_BYTES = int(os.environ.get("EXTRACTION_CACHE_BYTES", 64 * 1024 * 1024))
+EXTRACTION_CACHE_DIR = os.environ.get("EXTRACTION_CACHE_DIR")  # unset = memory only
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# DOCX text is read by streaming word/document.xml (plus the header/footer parts) instead of building
+# python-docx's object model; python-docx is only the fallback for files the streaming reader rejects.
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+R_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+_RUN_TEXT = {W + "tab": "\t", W + "ptab": "\t", W + "cr": "\n", W + "noBreakHyphen": "-"}
+
+
+def _run_text(run):
+    parts = []
+    for child in run:
+        if child.tag == W + "t":
+            parts.append(child.text or "")
+        elif child.tag == W + "br":
+            parts.append("\n" if child.get(W + "type", "textWrapping") == "textWrapping" else "")
+        else:
+            parts.append(_RUN_TEXT.get(child.tag, ""))
+    return "".join(parts)
+
+
+def _paragraph_text(p):
+    # Same as python-docx's Paragraph.text: direct runs and the runs of direct hyperlinks
+    parts = []
+    for child in p:
+        if child.tag == W + "r":
+            parts.append(_run_text(child))
+        elif child.tag == W + "hyperlink":
+            parts.extend(_run_text(r) for r in child.findall(W + "r"))
+    return "".join(parts)
+
+
+def _table_cells(tbl):
+    # One entry per cell: horizontally merged cells are one w:tc already, and the continuation
+    # rows of vertically merged cells are skipped (python-docx repeats their text per grid cell)
+    for tr in tbl.findall(W + "tr"):
+        for tc in tr.findall(W + "tc"):
+            v_merge = tc.find(f"{W}tcPr/{W}vMerge")
+            if v_merge is not None and v_merge.get(W + "val", "continue") == "continue":
+                continue
+            yield "\n".join(_paragraph_text(p) for p in tc.findall(W + "p"))
+
+
+def _section_parts(sect_pr, parts):
+    # Default header and footer of one section, each part only the first time it is referenced
+    for tag in ("headerReference", "footerReference"):
+        for ref in sect_pr.findall(W + tag):
+            if ref.get(W + "type") == "default" and ref.get(R_ID) not in parts:
+                parts.append(ref.get(R_ID))
+
+
+def extract_docx_xml(source):
+    """Text of a DOCX in extract_docx's order (body paragraphs, table cells, headers/footers),
+    with merged cells and repeated headers/footers once. Accepts a path or a file-like object."""
+    with zipfile.ZipFile(source) as z:
+        paragraphs, cells, parts = [], [], []
+        depth = 0
+        body = None
+        with z.open("word/document.xml") as f:
+            for event, elem in ET.iterparse(f, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if elem.tag == W + "body":
+                        body = elem
+                    continue
+                depth -= 1
+                if depth != 2 or body is None:
+                    continue
+                # A complete top-level element of the body: take its text, then drop it
+                if elem.tag == W + "p":
+                    paragraphs.append(_paragraph_text(elem))
+                    sect_pr = elem.find(f"{W}pPr/{W}sectPr")
+                    if sect_pr is not None:
+                        _section_parts(sect_pr, parts)
+                elif elem.tag == W + "tbl":
+                    cells.extend(_table_cells(elem))
+                elif elem.tag == W + "sectPr":
+                    _section_parts(elem, parts)
+                body.remove(elem)
+
+        targets = {}
+        with z.open("word/_rels/document.xml.rels") as f:
+            for rel in ET.parse(f).getroot():
+                targets[rel.get("Id")] = rel.get("Target")
+        furniture = []
+        for r_id in parts:
+            target = targets[r_id].lstrip("/")
+            with z.open(target if target.startswith("word/") else "word/" + target) as f:
+                furniture.extend(_paragraph_text(p) for p in ET.parse(f).getroot().findall(W + "p"))
+
+    return "\n".join(t for t in paragraphs + cells + furniture if t.strip() != "")
+
+
+def extract_docx(source): #separate DOCX parser; accepts a path or a file-like object
+    doc = Document(source)
+    text = []
+    for para in doc.paragraphs:
+        text.append(para.text)
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                text.append(cell.text)
+    for section in doc.sections:
+        for para in section.header.paragraphs:
+            text.append(para.text)
+        for para in section.footer.paragraphs:
+            text.append(para.text)
+    return "\n".join([t for t in text if t.strip() != ""])
+
+
+def _page_text(page, layout=PDF_LAYOUT):
+    if layout == "plain":
+        return page.get_text()
+    # Text lines top to bottom (MuPDF may merge side-by-side columns into one block, so lines are
+    # used). Lines crossing the middle of the page (headings, single-column paragraphs) split it into
+    # regions; a region with enough text on both sides is two columns and is read left column first,
+    # anything else (e.g. right-aligned dates) stays in line order.
+    mid = (page.rect.x0 + page.rect.x1) / 2
+    lines = []
+    for block in page.get_text("dict", flags=fitz.TEXT_PRESERVE_WHITESPACE)["blocks"]:
+        for line in block.get("lines", []):
+            text = "".join(span["text"] for span in line["spans"]).strip()
+            if text:
+                lines.append((line["bbox"], text))
+    lines.sort(key=lambda line: (round(line[0][1]), line[0][0]))
+    ordered, region = [], []
+
+    def flush():
+        left = [line for line in region if line[0][2] <= mid]
+        right = [line for line in region if line[0][0] >= mid]
+        if sum(len(t) for _, t in left) >= COLUMN_MIN_CHARS and sum(len(t) for _, t in right) >= COLUMN_MIN_CHARS:
+            ordered.extend(left + right)
+        else:
+            ordered.extend(region)
+        region.clear()
+
+    for line in lines:
+        if line[0][0] < mid < line[0][2]:
+            flush()
+            ordered.append(line)
+        else:
+            region.append(line)
+    flush()
+    return "\n".join(text for _, text in ordered)
+
+
+def read_pdf(data, start=0, stop=None, layout=PDF_LAYOUT, max_pages=PDF_MAX_PAGES):
+    """(text of pages [start, stop), page count of the whole document); pages past max_pages are
+    never read, and the stop defaults to that cap. Pages are loaded one at a time."""
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        limit = min(doc.page_count, max_pages) if max_pages > 0 else doc.page_count
+        pages = []
+        for number in range(start, limit if stop is None else min(stop, limit)):
+            page = doc.load_page(number)
+            pages.append(_page_text(page, layout))
+            del page  # frees the page's display list before the next one is parsed
+        return "\n".join(pages), doc.page_count
+
+
+def extract_pdf(data, start=0, stop=None, layout=PDF_LAYOUT, max_pages=PDF_MAX_PAGES):
+    """Text of pages [start, stop) (default: up to the page cap)."""
+    return read_pdf(data, start, stop, layout, max_pages)[0]
+
+
+def truncated_pages(page_count, max_pages=PDF_MAX_PAGES):
+    """Pages of a page_count-page PDF that the page cap leaves out."""
+    return max(page_count - max_pages, 0) if page_count and max_pages > 0 else 0
+
+
+def extract_text(filename, data):
+    """Extract text from an uploaded file's bytes; the extension of filename picks the parser."""
+    ext = pathlib.Path(filename).suffix.lower()
+
+    if ext == ".pdf":
+        return extract_pdf(data)
+
+    if ext == ".docx":
+        try:
+            return extract_docx_xml(io.BytesIO(data))
+        except (zipfile.BadZipFile, KeyError, ET.ParseError):
+            return extract_docx(io.BytesIO(data))  # python-docx reports what is wrong, or copes with it
+
+    if ext == ".doc":
+        # Word 97-2003, RTF, HTML or text under a .doc name, detected from the bytes (see legacy_doc.py)
+        return extract_legacy_doc(data, extract_docx_xml, extract_pdf)
+
+    raise ValueError(f"Unsupported file type: {ext}")
+
+
+class ExtractionCache:
+    """Extraction results ({"text", "truncated_pages"}) keyed by file hash: size-bounded in-memory LRU
+    plus an optional gzip file store."""
+
+    def __init__(self, max_bytes=EXTRACTION_CACHE_BYTES, cache_dir=EXTRACTION_CACHE_DIR):
+        self.memory = LRUCache(max_items=1_000_000, max_bytes=max_bytes, sizeof=lambda entry: len(entry["text"]) * 2)
+        self.cache_dir = cache_dir
+        self.disk_hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, filename, data):
+        ext = pathlib.Path(filename).suffix.lower()
+        if ext == ".pdf":
+            ext += f"-{PDF_LAYOUT}{PDF_MAX_PAGES}"  # PDF output depends on these settings
+        return f"{EXTRACTOR_VERSION}-{ext.lstrip('.')}-{hashlib.sha256(data).hexdigest()}"
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[-2:], f"{key}.json.gz")
+
+    def get(self, key):
+        entry = self.memory.get(key)
+        if entry is not None:
+            return entry
+        if self.cache_dir:
+            try:
+                with gzip.open(self._path(key), "rt", encoding="utf-8") as f:
+                    entry = json.load(f)
+                self.disk_hits += 1
+                self.memory.put(key, entry)
+                return entry
+            except FileNotFoundError:
+                pass
+        self.misses += 1
+        return None
+
+    def put(self, key, entry):
+        self.memory.put(key, entry)
+        if self.cache_dir:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as f:
+                f.write(gzip.compress(json.dumps(entry, ensure_ascii=False).encode("utf-8")))
+            os.replace(f.name, path)  # atomic, so concurrent workers never read a partial entry
+
+    def stats(self):
+        memory = self.memory.stats()
+        return {
+            "items": memory["items"],
+            "bytes": memory["bytes"],
+            "memory_hits": memory["hits"],
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": memory["evictions"],
+        }
+
+
+extraction_cache = ExtractionCache()
+
+
+def _format(filename):
+    return pathlib.Path(filename).suffix.lower().lstrip(".") or "none"
+
+
+def count_document(filename, data):
+    metrics.inc("screening_documents_total", format=_format(filename))
+    metrics.inc("screening_bytes_total", len(data), format=_format(filename))
+
+
+def _read(filename, data, pages=()):
+    # (text, page count); the page count is the whole document's for PDFs and None for other formats
+    if _format(filename) == "pdf":
+        return read_pdf(data, *pages)
+    return extract_text(filename, data), None
+
+
+def extract_text_cached(filename, data, timings=None):
+    count_document(filename, data)
+    key = extraction_cache.key(filename, data)
+    entry = extraction_cache.get(key)
+    if entry is None:
+        with metrics.timer(f"parse_{_format(filename)}", timings):
+            text, page_count = _read(filename, data)
+        entry = {"text": text, "truncated_pages": truncated_pages(page_count)}
+        extraction_cache.put(key, entry)
+    return entry["text"]
+
+
+def _extract_worker(filename, data, pages=()):
+    # Runs in a pool process; errors are returned rather than raised so one bad file can't fail the batch.
+    # The parse time goes back to the parent, which owns the metrics. pages=(start, stop) reads part of a PDF.
+    started = time.perf_counter()
+    try:
+        text, page_count = _read(filename, data, pages)
+        return {"text": text, "page_count": page_count, "error": None, "seconds": time.perf_counter() - started}
+    except Exception as e:
+        return {"text": None, "error": f"{type(e).__name__}: {e}", "seconds": time.perf_counter() - started}
+
+
+class _Unsubmitted:
+    # Stands in for a page range that could not be queued, so the file reports an error instead of a gap
+    def __init__(self, error):
+        self.error = error
+
+    def ready(self):
+        return True
+
+    def get(self, timeout=None):
+        return {"text": None, "error": self.error, "seconds": 0.0}
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            ctx = multiprocessing.get_context(EXTRACT_START_METHOD)
+            _pool = ctx.Pool(EXTRACT_WORKERS, maxtasksperchild=EXTRACT_MAX_TASKS)
+        return _pool
+
+
+def _submit(pool, filename, data):
+    # Long PDFs are split into page ranges so one oversized upload is parsed on several cores. The
+    # upload is never opened in this process: the first range's task reports the page count, and its
+    # callback queues the remaining ranges as soon as it finishes.
+    if _format(filename) != "pdf" or PDF_PAGES_PER_TASK <= 0:
+        return [pool.apply_async(_extract_worker, (filename, data))]
+    parts = []
+
+    def queue_rest(first):
+        page_count = first.get("page_count") or 0  # none when the first range failed
+        pages = page_count - truncated_pages(page_count)
+        for start in range(PDF_PAGES_PER_TASK, pages, PDF_PAGES_PER_TASK):
+            try:
+                parts.append(pool.apply_async(_extract_worker, (filename, data, (start, start + PDF_PAGES_PER_TASK))))
+            except ValueError as e:  # the pool was retired after a timeout elsewhere
+                parts.append(_Unsubmitted(f"{type(e).__name__}: {e}"))
+
+    parts.append(pool.apply_async(_extract_worker, (filename, data, (0, PDF_PAGES_PER_TASK)), callback=queue_rest))
+    return parts
+
+
+def _collect(parts, timeout):
+    # Joins a file's tasks in page order; the timeout covers the whole file, not each part. Ranges
+    # queued by the first task's callback are in parts by the time its result is returned.
+    deadline = time.monotonic() + timeout
+    results = []
+    while len(results) < len(parts):
+        results.append(parts[len(results)].get(timeout=max(deadline - time.monotonic(), 0)))
+    seconds = sum(r["seconds"] for r in results)
+    for result in results:
+        if result["error"] is not None:
+            return dict(result, seconds=seconds)
+    return {
+        "text": "\n".join(r["text"] for r in results),
+        "truncated_pages": truncated_pages(results[0]["page_count"]),
+        "error": None,
+        "seconds": seconds,
+    }
+
+
+def _retire_pool(pool, grace):
+    # A worker is stuck (or died mid-task): new requests get a fresh pool, and the old one is
+    # terminated once requests still waiting on it have had their own timeout to finish
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    timer = threading.Timer(grace, pool.terminate)
+    timer.daemon = True
+    timer.start()
+
+
+def iter_extract(uploads, timeout=EXTRACT_TIMEOUT, timings=None):
+    """Extract text from many (filename, bytes) uploads in parallel, yielding {"text", "truncated_pages",
+    "error"} dicts in input order as soon as each one is ready; truncated_pages counts the PDF pages
+    past PDF_MAX_PAGES that were not read. Per-format parse times are summed into timings."""
+    if not uploads:
+        return
+    for filename, data in uploads:
+        count_document(filename, data)
+
+    # Cache hits are answered in-process; only misses are shipped to the pool
+    keys = [extraction_cache.key(filename, data) for filename, data in uploads]
+    results = [None] * len(uploads)
+    pending = {}
+    pool = None
+    for i, (key, (filename, data)) in enumerate(zip(keys, uploads)):
+        entry = extraction_cache.get(key)
+        if entry is not None:
+            results[i] = dict(entry, error=None)
+            continue
+        pool = pool or _get_pool()
+        pending[i] = _submit(pool, filename, data)
+
+    for i in range(len(uploads)):
+        if i in pending:
+            try:
+                results[i] = _collect(pending.pop(i), timeout)
+            except multiprocessing.TimeoutError:
+                results[i] = {"text": None, "error": f"Extraction timed out after {timeout:g}s"}
+                # The stuck task keeps its worker, so files queued behind it would never start: retire
+                # the pool now and move every file that hasn't finished to a fresh one
+                _retire_pool(pool, timeout)
+                pool = _get_pool()
+                for j, parts in pending.items():
+                    if not all(part.ready() for part in parts):
+                        pending[j] = _submit(pool, *uploads[j])
+            else:
+                metrics.observe(f"parse_{_format(uploads[i][0])}", results[i].pop("seconds"), timings)
+                if results[i]["error"] is None:
+                    extraction_cache.put(keys[i], {"text": results[i]["text"], "truncated_pages": results[i]["truncated_pages"]})
+        yield results[i]
@@ -0,0 +1,26 @@
+import gc
+import os
+
+# e.g. `gunicorn -w 4 multiv2:app` — the app (and its SentenceTransformer) is imported once in
+# the master; forked workers share the model weights copy-on-write instead of each loading a copy.
+# The job store and candidate index open their SQLite connections in each worker on first use.
+bind = f"0.0.0.0:{os.environ.get('PORT', 10000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 300))
+
+# Warm-up runs in each worker: torch's thread pools don't survive fork
+os.environ.setdefault("SBERT_WARMUP", "fork")
+
+
+def when_ready(server):
+    # Move everything allocated during preload out of the collector's reach, so gc passes in the
+    # workers don't touch (and un-share) those pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import encoder
+
+    if encoder.SBERT_WARMUP == "fork":
+        encoder.warm_up()
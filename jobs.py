@@ -0,0 +1,159 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+from pipeline import PipelineError
+
+# Bulk screening runs in the background: requests submit a job and poll it, so a web worker is
+# never held open for the whole extract -> encode -> LLM pipeline
+JOB_DB_PATH = os.environ.get("JOB_DB_PATH", "/tmp/screening_jobs.sqlite3")
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+JOB_RETENTION = float(os.environ.get("JOB_RETENTION", 7 * 24 * 60 * 60))  # seconds finished jobs are kept
+
+
+def new_progress(total):
+    return {"total": total, "extracted": 0, "failed": 0, "duplicates": 0, "scored": 0, "screened_out": 0, "assessed": 0}
+
+
+def _pid_alive(pid):
+    if pid is None or pid == os.getpid():
+        return False  # a fresh store in this process cannot own running jobs yet
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobStore:
+    """SQLite-backed job records: status, progress counters, partial results and the final result."""
+
+    def __init__(self, path=JOB_DB_PATH):
+        self.path = path
+        self._pid = None
+        self._connection = None
+        self._lock = threading.Lock()
+        with closing(sqlite3.connect(path)) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    progress TEXT NOT NULL,
+                    partial TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    status_code INTEGER,
+                    worker_pid INTEGER
+                )"""
+            )
+
+    @property
+    def _conn(self):
+        # One connection per process, opened on first use: SQLite connections must not be used
+        # across fork(), and with gunicorn's preload_app the store is created in the master
+        if self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._pid = os.getpid()
+        return self._connection
+
+    def create(self, total):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        progress = new_progress(total)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, created_at, updated_at, progress, partial, worker_pid) VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, now, now, json.dumps(progress), json.dumps({"scored": [], "shards": []}), os.getpid()),
+            )
+        return job_id
+
+    def update(self, job_id, **fields):
+        for name in ("progress", "partial", "result", "error"):
+            if name in fields:
+                fields[name] = json.dumps(fields[name])
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, created_at, updated_at, progress, partial, result, error, status_code FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(("job_id", "status", "created_at", "updated_at", "progress", "partial", "result", "error", "status_code"), row))
+        for name in ("progress", "partial", "result", "error"):
+            job[name] = json.loads(job[name]) if job[name] is not None else None
+        return job
+
+    def recover(self, retention=JOB_RETENTION):
+        # Uploads are not persisted, so jobs whose worker process has died cannot resume; mark them
+        # failed. Jobs owned by sibling workers that are still alive are left alone. Runs at startup
+        # (possibly in a pre-fork master), so it uses a connection of its own.
+        with self._lock, closing(sqlite3.connect(self.path)) as conn, conn:
+            unfinished = conn.execute("SELECT id, worker_pid FROM jobs WHERE status IN ('queued', 'running')").fetchall()
+            orphaned = [job_id for job_id, pid in unfinished if not _pid_alive(pid)]
+            conn.executemany(
+                "UPDATE jobs SET status = 'failed', error = ?, status_code = 500 WHERE id = ?",
+                [(json.dumps({"error": "Job interrupted by a server restart"}), job_id) for job_id in orphaned],
+            )
+            conn.execute("DELETE FROM jobs WHERE updated_at < ? AND status IN ('done', 'failed')", (time.time() - retention,))
+
+
+class JobQueue:
+    """Runs pipeline event streams on a local thread pool, recording progress in a JobStore."""
+
+    def __init__(self, store=None, workers=JOB_WORKERS):
+        self.store = store or JobStore()
+        self.store.recover()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="screening-job")
+
+    def submit(self, events, total):
+        job_id = self.store.create(total)
+        self._executor.submit(self._run, job_id, events, total)
+        return job_id
+
+    def _run(self, job_id, events, total):
+        progress = new_progress(total)
+        partial = {"scored": [], "shards": []}
+        self.store.update(job_id, status="running")
+        try:
+            for event, payload in events:
+                if event == "extracted":
+                    progress["failed" if "error" in payload else "extracted"] += 1
+                elif event == "deduplicated":
+                    progress["duplicates"] += len(payload["aliases"])
+                elif event == "scored":
+                    progress["scored"] += 1
+                    partial["scored"].append(payload)
+                elif event == "screened_out":
+                    progress["screened_out"] += 1
+                elif event == "shard":
+                    progress["assessed"] += len(payload["Ranking"])
+                    progress["failed"] += len(payload["failed"])
+                    partial["shards"].append(payload)
+                elif event == "shard_error":
+                    progress["failed"] += len(payload["resume_names"])
+                    partial["shards"].append(payload)
+                elif event == "result":
+                    self.store.update(job_id, status="done", progress=progress, partial=partial, result=payload, status_code=200)
+                    return
+                self.store.update(job_id, progress=progress, partial=partial)
+        except PipelineError as e:
+            self.store.update(job_id, status="failed", progress=progress, partial=partial, error=e.body, status_code=e.status)
+        except Exception as e:
+            self.store.update(job_id, status="failed", progress=progress, partial=partial,
+                              error={"error": "Screening job crashed", "exception": str(e)}, status_code=500)
@@ -0,0 +1,176 @@
+import html
+import io
+import logging
+import re
+import struct
+
+# Legacy ".doc" uploads (old ATS exports) are a mix of real Word 97-2003 binaries, RTF, HTML and
+# plain text saved under a .doc name, and sometimes DOCX/PDF. The real format is sniffed from the
+# first bytes and each is converted in-process, so no converter subprocess is started per file;
+# the extraction pool's long-lived workers give the concurrency limit and per-file timeout.
+
+log = logging.getLogger(__name__)
+
+OLE_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+
+def sniff_format(data):
+    """Real format of a legacy document: ole, rtf, docx, pdf, html, text or binary."""
+    head = data[:512].lstrip()
+    if data.startswith(OLE_MAGIC):
+        return "ole"
+    if head.startswith(b"{\\rtf"):
+        return "rtf"
+    if data.startswith(b"PK\x03\x04"):
+        return "docx"
+    if head.startswith(b"%PDF"):
+        return "pdf"
+    if re.match(rb"(?:\xef\xbb\xbf)?\s*(?:<!doctype html|<html|<\?xml|mime-version:)", head, re.IGNORECASE):
+        return "html"
+    if b"\x00" not in data[:4096]:
+        return "text"
+    return "binary"
+
+
+# --- RTF -------------------------------------------------------------------------------------
+
+_RTF_TOKEN = re.compile(rb"\\([a-z]{1,32})(-?\d{1,10})? ?|\\'([0-9a-f]{2})|\\([^a-z])|([{}])|[\r\n]+|([^\\{}\r\n]+)", re.IGNORECASE)
+_RTF_SKIP = {
+    b"fonttbl", b"colortbl", b"stylesheet", b"info", b"pict", b"object", b"header", b"footer", b"headerl",
+    b"headerr", b"headerf", b"footerl", b"footerr", b"footerf", b"listtable", b"listoverridetable",
+    b"rsidtbl", b"generator", b"xmlnstbl", b"themedata", b"colorschememapping", b"latentstyles", b"datastore",
+}
+_RTF_CHARS = {b"par": "\n", b"line": "\n", b"sect": "\n", b"page": "\n", b"row": "\n", b"cell": "\t", b"tab": "\t",
+              b"emdash": "\u2014", b"endash": "\u2013", b"bullet": "\u2022", b"lquote": "\u2018", b"rquote": "\u2019",
+              b"ldblquote": "\u201c", b"rdblquote": "\u201d"}
+
+
+def rtf_to_text(data):
+    """Plain text of an RTF document (skipping font/style tables, pictures and other destinations)."""
+    out = []
+    stack = []  # (skipping, unicode fallback length) of the enclosing groups
+    skipping, uc, pending_skip = False, 1, 0
+    for word, arg, hexcode, symbol, brace, text in (m.groups() for m in _RTF_TOKEN.finditer(data)):
+        if brace:
+            pending_skip = 0
+            if brace == b"{":
+                stack.append((skipping, uc))
+            elif stack:
+                skipping, uc = stack.pop()
+            continue
+        if pending_skip and (hexcode or text):
+            # Characters after \uN are the fallback for readers without Unicode support
+            if text and len(text) > pending_skip:
+                text = text[pending_skip:]
+                pending_skip = 0
+            else:
+                pending_skip -= 1 if hexcode else len(text or b"")
+                continue
+        if word:
+            word = word.lower()
+            if word in _RTF_SKIP:
+                skipping = True
+            elif word == b"uc":
+                uc = int(arg or 1)
+            elif word == b"u" and not skipping:
+                out.append(chr(int(arg) % 65536))
+                pending_skip = uc
+            elif word in _RTF_CHARS and not skipping:
+                out.append(_RTF_CHARS[word])
+        elif symbol:
+            if symbol == b"*":
+                skipping = True  # ignorable destination
+            elif symbol in b"\\{}" and not skipping:
+                out.append(symbol.decode())
+            elif symbol == b"~" and not skipping:
+                out.append("\xa0")
+        elif hexcode and not skipping:
+            out.append(bytes.fromhex(hexcode.decode()).decode("cp1252", errors="replace"))
+        elif text and not skipping:
+            out.append(text.decode("cp1252", errors="replace"))
+    return "".join(out)
+
+
+# --- Word 97-2003 binary -------------------------------------------------------------------
+
+def word97_text(word, table):
+    """Main-document text of a Word 97-2003 file from its WordDocument and 0Table/1Table streams,
+    read through the piece table (the CLX in the table stream)."""
+    ccp_text = struct.unpack_from("<i", word, 0x004C)[0]
+    fc_clx, lcb_clx = struct.unpack_from("<II", word, 0x01A2)
+    clx = table[fc_clx:fc_clx + lcb_clx]
+    pos = 0
+    while pos < len(clx) and clx[pos] == 0x01:  # Prc entries (formatting), not needed for text
+        pos += 3 + struct.unpack_from("<H", clx, pos + 1)[0]
+    if pos >= len(clx) or clx[pos] != 0x02:
+        raise ValueError("no piece table in the document")
+    lcb = struct.unpack_from("<I", clx, pos + 1)[0]
+    plc = clx[pos + 5:pos + 5 + lcb]
+    pieces = (lcb - 4) // 12
+    cps = struct.unpack_from(f"<{pieces + 1}I", plc)
+
+    parts = []
+    for i in range(pieces):
+        fc = struct.unpack_from("<I", plc, 4 * (pieces + 1) + 8 * i + 2)[0]
+        count = cps[i + 1] - cps[i]
+        if fc & 0x40000000:  # 8-bit "compressed" text
+            start = (fc & 0x3FFFFFFF) // 2
+            parts.append(word[start:start + count].decode("cp1252", errors="replace"))
+        else:
+            parts.append(word[fc:fc + 2 * count].decode("utf-16-le", errors="replace"))
+    return _clean_word_text("".join(parts)[:ccp_text])
+
+
+def _clean_word_text(text):
+    # Fields are \x13 instructions [\x14 result] \x15: keep the results, innermost fields first
+    previous = None
+    while previous != text:
+        previous = text
+        text = re.sub(r"\x13[^\x13\x14\x15]*\x14([^\x13\x14\x15]*)\x15", r"\1", text)
+        text = re.sub(r"\x13[^\x13\x14\x15]*\x15", "", text)
+    text = text.translate({0x0D: "\n", 0x07: "\n", 0x0B: "\n", 0x0C: "\n", 0x1E: "-", 0x1F: None})
+    return re.sub(r"[\x00-\x08\x0e-\x1f]", "", text)
+
+
+def ole_to_text(data):
+    """Text of a Word 97-2003 (OLE compound file) document."""
+    import olefile  # only needed for binary .doc uploads
+
+    with olefile.OleFileIO(io.BytesIO(data)) as ole:
+        word = ole.openstream("WordDocument").read()
+        flags = struct.unpack_from("<H", word, 0x000A)[0]
+        table = ole.openstream("1Table" if flags & 0x0200 else "0Table").read()
+    return word97_text(word, table)
+
+
+def binary_strings(data, min_chars=8):
+    """Last resort for unreadable binaries: runs of printable UTF-16LE or 8-bit text, whichever is longer."""
+    wide = [m.decode("utf-16-le") for m in re.findall(rb"(?:[\x20-\x7e\t\r\n]\x00){%d,}" % min_chars, data)]
+    narrow = [m.decode("latin-1") for m in re.findall(rb"[\x20-\x7e\t\r\n]{%d,}" % min_chars, data)]
+    runs = wide if sum(map(len, wide)) >= sum(map(len, narrow)) else narrow
+    return "\n".join(run.strip() for run in runs if run.strip())
+
+
+def extract_legacy_doc(data, extract_docx, extract_pdf):
+    """Text of a .doc upload in whatever format it really is. The DOCX and PDF extractors are passed in."""
+    fmt = sniff_format(data)
+    if fmt == "ole":
+        try:
+            return ole_to_text(data)
+        except Exception as e:  # olefile missing, encrypted or pre-97 file, damaged piece table
+            log.warning("Word binary reader failed (%s); falling back to text runs", e)
+            return binary_strings(data)
+    if fmt == "rtf":
+        return rtf_to_text(data)
+    if fmt == "docx":
+        return extract_docx(io.BytesIO(data))
+    if fmt == "pdf":
+        return extract_pdf(data)
+    if fmt == "html":
+        text = data.decode("utf-8", errors="ignore")
+        text = re.sub(r"(?is)<(script|style|head)\b.*?</\1>", "", text)
+        text = re.sub(r"(?i)<br\s*/?>|</(?:p|div|li|tr|h\d)>", "\n", text)
+        return html.unescape(re.sub(r"<[^>]+>", "", text))
+    if fmt == "text":
+        return data.decode("utf-8", errors="ignore")
+    return binary_strings(data)
@@ -0,0 +1,294 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import namedtuple
+
+import httpx
+
+from compaction import estimate_tokens
+from llm_cache import llm_cache, prompt_version
+from metrics import metrics
+from llm_output import parse_ranking
+from ranking import LLMOutputError, merge_rankings
+
+# Both ranking apps talk to their LLM through one interface: a pooled client per process, a
+# process-wide cap on in-flight calls, per-call timeouts and exponential backoff on 429/5xx.
+# LLM_BACKEND overrides the app's provider (gemini | openai | fake).
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", 120))  # seconds per call attempt
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 4))
+LLM_BACKOFF_BASE = float(os.environ.get("LLM_BACKOFF_BASE", 1.0))
+LLM_BACKOFF_MAX = float(os.environ.get("LLM_BACKOFF_MAX", 30.0))
+LLM_PROVIDER_CONCURRENCY = int(os.environ.get("LLM_PROVIDER_CONCURRENCY", 8))  # across all requests in a process
+LLM_REPAIR_ATTEMPTS = int(os.environ.get("LLM_REPAIR_ATTEMPTS", 2))  # re-requests for missing/malformed candidates
+
+JSON_ONLY = "You are TalentMatchAI. Return ONLY a strict JSON object per the schema. No prose, no code fences."
+
+# Text is always set; data/mime_type let a backend send the original file (e.g. a PDF) instead
+Document = namedtuple("Document", ["text", "data", "mime_type"], defaults=(None, None))
+
+
+class LLMUnavailableError(RuntimeError):
+    """Every attempt failed with a retryable error, or no call slot freed up within the timeout."""
+
+
+class LLMBackend:
+    """Base class: subclasses implement _call(); complete() adds the concurrency cap, timeouts and retries."""
+
+    name = None
+    # Connection failures and timeouts are retried; subclasses add their SDK's own exception types
+    transient_errors = (httpx.TransportError, ConnectionError, TimeoutError)
+
+    def __init__(self, model, timeout=LLM_TIMEOUT, max_retries=LLM_MAX_RETRIES, max_concurrency=LLM_PROVIDER_CONCURRENCY):
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+
+    def _call(self, documents, system, json_mode):
+        """Return (text, (prompt_tokens, completion_tokens) or None when the provider reports no usage)."""
+        raise NotImplementedError
+
+    def _count_tokens(self, documents, system, text, usage):
+        if usage is None or None in usage:
+            # Attached files (e.g. a JD PDF) are counted by their text
+            prompt = (system or "") + "".join(d if isinstance(d, str) else d.text for d in documents)
+            usage = (estimate_tokens(prompt), estimate_tokens(text))
+        metrics.inc("screening_llm_tokens_total", usage[0], backend=self.name, direction="prompt")
+        metrics.inc("screening_llm_tokens_total", usage[1], backend=self.name, direction="completion")
+
+    def retryable(self, error):
+        status = getattr(error, "status_code", None) or getattr(error, "code", None)
+        if isinstance(status, int):
+            return status == 429 or status >= 500
+        return isinstance(error, self.transient_errors)
+
+    def _retry_after(self, error, attempt):
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        try:
+            return min(float(headers.get("retry-after")), LLM_BACKOFF_MAX)
+        except (TypeError, ValueError):
+            # Full jitter, so shards that were throttled together don't retry together
+            return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+
+    def complete(self, documents, system=None, json_mode=False):
+        """Send documents (str or Document, in order) and return the response text."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise LLMUnavailableError(f"No {self.name} call slot free after {self.timeout}s")
+        try:
+            for attempt in range(self.max_retries + 1):
+                with self._stats_lock:
+                    self.calls += 1
+                try:
+                    with metrics.timer(f"llm_call_{self.name}"):
+                        text, usage = self._call(documents, system, json_mode)
+                    self._count_tokens(documents, system, text, usage)
+                    return text
+                except Exception as e:
+                    if not self.retryable(e):
+                        raise
+                    if attempt == self.max_retries:
+                        with self._stats_lock:
+                            self.failures += 1
+                        raise LLMUnavailableError(f"{self.name} failed after {attempt + 1} attempts: {e}") from e
+                    with self._stats_lock:
+                        self.retries += 1
+                    time.sleep(self._retry_after(e, attempt))
+        finally:
+            self._slots.release()
+
+    def stats(self):
+        with self._stats_lock:
+            return {"backend": self.name, "model": self.model, "calls": self.calls, "retries": self.retries, "failures": self.failures}
+
+
+class GeminiBackend(LLMBackend):
+    name = "gemini"
+
+    def __init__(self, model=None, **kwargs):
+        from google import genai
+        from google.auth.exceptions import TransportError
+        from google.genai import types
+
+        super().__init__(model or os.environ.get("GEMINI_MODEL", "gemini-2.0-flash"), **kwargs)
+        self.types = types
+        # HTTP errors (genai.errors.APIError) carry .code; transport failures come up from httpx or google-auth
+        self.transient_errors = LLMBackend.transient_errors + (TransportError,)
+        # The client keeps one pooled httpx session; retries are ours, not the SDK's
+        self.client = genai.Client(
+            api_key=os.environ.get("GEMINI_API_KEY"),
+            http_options=types.HttpOptions(timeout=int(self.timeout * 1000)),
+        )
+
+    def _part(self, document):
+        if isinstance(document, str):
+            return self.types.Part(text=document)
+        if document.data is not None:
+            return self.types.Part.from_bytes(data=document.data, mime_type=document.mime_type)
+        return self.types.Part(text=document.text)
+
+    def _call(self, documents, system, json_mode):
+        config = self.types.GenerateContentConfig(
+            system_instruction=system,
+            response_mime_type="application/json" if json_mode else None,
+        )
+        response = self.client.models.generate_content(
+            model=self.model,
+            contents=[self._part(d) for d in documents],
+            config=config,
+        )
+        usage = getattr(response, "usage_metadata", None)
+        return response.text, (usage.prompt_token_count, usage.candidates_token_count) if usage else None
+
+
+class OpenAIBackend(LLMBackend):
+    name = "openai"
+
+    def __init__(self, model=None, **kwargs):
+        import openai
+        from openai import OpenAI
+
+        super().__init__(model or os.environ.get("OPENAI_MODEL", "gpt-5-nano-2025-08-07"), **kwargs)
+        # The SDK wraps httpx timeouts and connection errors in its own types, which carry no status
+        self.transient_errors = LLMBackend.transient_errors + (openai.APITimeoutError, openai.APIConnectionError)
+        self.client = OpenAI(
+            api_key=os.environ.get("OPENAI_API_KEY"),
+            timeout=self.timeout,
+            max_retries=0,
+            http_client=httpx.Client(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=LLM_PROVIDER_CONCURRENCY, max_keepalive_connections=LLM_PROVIDER_CONCURRENCY),
+            ),
+        )
+
+    def _call(self, documents, system, json_mode):
+        messages = [{"role": "system", "content": system}] if system else []
+        messages.append({"role": "user", "content": "\n".join(d if isinstance(d, str) else d.text for d in documents)})
+        options = {"response_format": {"type": "json_object"}} if json_mode else {}
+        response = self.client.chat.completions.create(model=self.model, temperature=1, messages=messages, **options)
+        usage = response.usage
+        return response.choices[0].message.content, (usage.prompt_tokens, usage.completion_tokens) if usage else None
+
+
+class FakeRateLimitError(Exception):
+    status_code = 429
+
+
+class FakeBackend(LLMBackend):
+    """Local stand-in for tests and load runs: ranks resumes by SBERT score after an optional delay,
+    and can inject 429s (LLM_FAKE_ERROR_RATE) to exercise the retry path."""
+
+    name = "fake"
+
+    def __init__(self, model="fake", latency=None, error_rate=None, **kwargs):
+        super().__init__(model, **kwargs)
+        self.latency = float(os.environ.get("LLM_FAKE_LATENCY", 0)) if latency is None else latency
+        self.error_rate = float(os.environ.get("LLM_FAKE_ERROR_RATE", 0)) if error_rate is None else error_rate
+
+    def _call(self, documents, system, json_mode):
+        time.sleep(self.latency)
+        if random.random() < self.error_rate:
+            raise FakeRateLimitError()
+        text = "\n".join(d if isinstance(d, str) else d.text for d in documents)
+        if not json_mode:
+            return "1. Fitment Score: 5\n2. Selection: Considered\n3. Rationale: Generated by the fake LLM backend.", None
+        resumes = re.findall(r"^Resume Filename: (.*)\nSBERT Score: (.*)$", text, flags=re.MULTILINE)
+        resumes.sort(key=lambda r: float(r[1]), reverse=True)
+        return json.dumps({
+            "Ranking": [
+                {
+                    "name": os.path.splitext(filename)[0],
+                    "sbert_score": float(score),
+                    "fitment_score": max(1, round(float(score) * 10)),
+                    "selection": float(score) >= 0.5,
+                    "rationale": "Ranked by SBERT similarity (fake LLM backend).",
+                    "skill_gap_table": [],
+                    "experience_summary": "",
+                    "skill_presence": {},
+                    "suggested_domains": [],
+                    "resume_filename": filename,
+                }
+                for filename, score in resumes
+            ],
+            "Summary": f"{len(resumes)} candidates ranked by the fake LLM backend.",
+        }), None
+
+
+BACKENDS = {"gemini": GeminiBackend, "openai": OpenAIBackend, "fake": FakeBackend}
+
+
+def make_backend(default):
+    name = os.environ.get("LLM_BACKEND", default)
+    if name not in BACKENDS:
+        raise ValueError(f"LLM_BACKEND must be one of {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+def _shard_documents(prompt, jd, shard):
+    documents = [prompt, "\n=== JOB DESCRIPTION ===\n", jd, "\n=== RESUMES ===\n"]
+    for r in shard:
+        documents.append(
+            f"\n--- RESUME START ---\n"
+            f"Resume Filename: {r['resume_name']}\n"
+            f"SBERT Score: {r['sbert_score']}\n\n"
+            f"{r.get('prompt_text', r['resume_text'])}\n"
+            f"--- RESUME END ---"
+        )
+    return documents
+
+
+def assess_shard(backend, prompt, jd, shard, repair_attempts=LLM_REPAIR_ATTEMPTS):
+    """Rank a shard of candidates against the JD (a str or Document).
+
+    Each Ranking entry is validated on its own; candidates that come back missing or malformed are
+    re-requested on their own, up to repair_attempts times. Any still missing after that are listed
+    under "failed" rather than failing the shard.
+    """
+    jd_text = jd if isinstance(jd, str) else jd.text
+    # Identical JD + shard (same files, scores and prompt) is served from the response cache.
+    # Resumes are sent as compacted by the pipeline (prompt_text), when it did so.
+    cache_key = llm_cache.key(backend.model, prompt_version(prompt), jd_text, *(
+        f"{r['resume_name']}\0{r['sbert_score']}\0{r.get('prompt_text', r['resume_text'])}" for r in shard
+    ))
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    entries, summary, problems, error = {}, None, {}, None
+    pending = shard
+    for attempt in range(repair_attempts + 1):
+        raw = backend.complete(_shard_documents(prompt, jd, pending), system=JSON_ONLY, json_mode=True)
+        try:
+            valid, part_summary, problems = parse_ranking(raw, [r["resume_name"] for r in pending])
+        except LLMOutputError as e:
+            error = e
+            continue
+        entries.update(valid)
+        summary = part_summary if summary is None else summary
+        pending = [r for r in pending if r["resume_name"] in problems]
+        if not pending:
+            break
+        metrics.inc("screening_llm_repairs_total", len(pending))
+
+    if not entries:
+        raise error or LLMOutputError(f"No valid Ranking entries: {problems}", raw)
+
+    ranking = list(entries.values())
+    if attempt > 0:
+        # Repaired entries come from separate calls, so re-rank the combined list
+        ranking = merge_rankings([{"Ranking": ranking}], shard)["Ranking"]
+    data = {"Ranking": ranking, "Summary": summary or ""}
+    if pending:
+        data["failed"] = [
+            {"resume_name": r["resume_name"], "error": f"Invalid LLM output: {problems.get(r['resume_name'], 'no Ranking list')}"}
+            for r in pending
+        ]
+    else:
+        llm_cache.put(cache_key, data)  # only complete answers are cached
+    return data
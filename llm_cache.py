@@ -0,0 +1,41 @@
+import copy
+import hashlib
+import os
+
+from cache import LRUCache
+
+# Identical (model, prompt, documents) requests are answered from memory instead of calling the LLM again
+LLM_CACHE_SIZE = int(os.environ.get("LLM_CACHE_SIZE", 1024))
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", 24 * 60 * 60))  # seconds
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def prompt_version(prompt):
+    # Derived from the prompt text itself, so editing a prompt invalidates its cached responses
+    return content_hash(prompt)[:12]
+
+
+class LLMResponseCache:
+    """LLM responses keyed on model name, prompt version and the content hashes of every input document."""
+
+    def __init__(self, max_items=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL):
+        self.memory = LRUCache(max_items, ttl=ttl)
+
+    def key(self, model, version, *documents):
+        return content_hash("\0".join([model, version] + [content_hash(d) for d in documents]))
+
+    def get(self, key):
+        # Callers decorate the parsed response in place, so hand out copies
+        return copy.deepcopy(self.memory.get(key))
+
+    def put(self, key, response):
+        self.memory.put(key, copy.deepcopy(response))
+
+    def stats(self):
+        return self.memory.stats()
+
+
+llm_cache = LLMResponseCache()
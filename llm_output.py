@@ -0,0 +1,156 @@
+import json
+import re
+
+from ranking import LLMOutputError
+
+# LLM ranking output is parsed one Ranking entry at a time and each entry is validated on its own,
+# so a truncated response or one malformed candidate only costs that candidate, not the batch.
+
+_decoder = json.JSONDecoder()
+_SEPARATORS = re.compile(r"[\s,]*")
+
+
+_REJECTED = re.compile(r"\b(?:not|no|false|reject(?:ed)?)\b|❌")
+_SELECTED = ("true", "yes", "select", "selected", "✅", "✅ selected")
+
+
+def _as_selection(value):
+    # Negatives are checked first ("Not selected"); anything else that isn't an exact token goes to repair
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        if _REJECTED.search(lowered):
+            return False
+        if lowered in _SELECTED:
+            return True
+    raise ValueError(f"selection must be a boolean, got {value!r}")
+
+
+def validate_entry(entry, filenames):
+    """Return a normalized copy of one Ranking entry, or raise ValueError naming what is wrong.
+
+    filenames maps lower-cased resume filenames to the uploaded ones.
+    """
+    if not isinstance(entry, dict):
+        raise ValueError("entry is not an object")
+    filename = filenames.get(str(entry.get("resume_filename", "")).strip().lower())
+    if filename is None:
+        raise ValueError(f"unknown resume_filename {entry.get('resume_filename')!r}")
+    try:
+        score = float(entry["fitment_score"])
+    except KeyError:
+        raise ValueError("missing fitment_score")
+    except (TypeError, ValueError):
+        raise ValueError(f"fitment_score is not a number: {entry['fitment_score']!r}")
+    if not 0 <= score <= 10:
+        raise ValueError(f"fitment_score {score} is outside 0-10")
+    if "selection" not in entry:
+        raise ValueError("missing selection")
+
+    return dict(
+        entry,
+        resume_filename=filename,
+        name=str(entry.get("name") or filename.rsplit(".", 1)[0]),
+        fitment_score=int(score) if score.is_integer() else score,
+        selection=_as_selection(entry["selection"]),
+        rationale=str(entry.get("rationale") or ""),
+        skill_gap_table=entry.get("skill_gap_table") if isinstance(entry.get("skill_gap_table"), list) else [],
+        experience_summary=str(entry.get("experience_summary") or ""),
+        skill_presence=entry.get("skill_presence") if isinstance(entry.get("skill_presence"), dict) else {},
+        suggested_domains=entry.get("suggested_domains") if isinstance(entry.get("suggested_domains"), list) else [],
+    )
+
+
+class RankingParser:
+    """Incremental parser for {"Ranking": [...], "Summary": ...} text.
+
+    feed() accepts the response in any number of chunks (e.g. as it streams in) and returns the
+    entries completed so far; close() salvages what it can from a malformed or truncated tail.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = None  # next unparsed position inside the Ranking array, once it has been found
+        self.done = False
+        self.entries = []
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        if self.pos is None:
+            match = re.search(r'"Ranking"\s*:\s*\[', self.buffer)
+            if not match:
+                return []
+            self.pos = match.end()
+        return self._scan(final=False)
+
+    def _scan(self, final):
+        found = []
+        while not self.done:
+            self.pos = _SEPARATORS.match(self.buffer, self.pos).end()
+            if self.pos >= len(self.buffer):
+                break
+            if self.buffer[self.pos] == "]":
+                self.done = True
+                break
+            try:
+                entry, end = _decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if not final:
+                    break  # probably incomplete; wait for more text
+                # Malformed entry: resume at the next object start and let validation sort it out
+                next_start = self.buffer.find("{", self.pos + 1)
+                if next_start == -1:
+                    break
+                self.pos = next_start
+                continue
+            found.append(entry)
+            self.pos = end
+        self.entries.extend(found)
+        return found
+
+    def close(self):
+        """Finish parsing; returns (entries, summary, raw text)."""
+        raw = re.sub(r"^```(?:json)?|```$", "", self.buffer.strip(), flags=re.MULTILINE).strip()
+        try:
+            # The common case: the whole response is valid JSON
+            data = json.loads(raw)
+            if isinstance(data, dict) and isinstance(data.get("Ranking"), list):
+                self.entries = data["Ranking"]
+                return self.entries, data.get("Summary") if isinstance(data.get("Summary"), str) else "", raw
+        except ValueError:
+            pass
+
+        if self.pos is None:
+            raise LLMOutputError("Response has no Ranking list", raw)
+        self._scan(final=True)
+        summary = re.search(r'"Summary"\s*:\s*"((?:[^"\\]|\\.)*)"', self.buffer)
+        return self.entries, json.loads(f'"{summary.group(1)}"') if summary else "", raw
+
+
+def parse_ranking(raw, filenames):
+    """Split a ranking response into (valid entries by filename, summary, {filename: problem}).
+
+    Raises LLMOutputError only when the response has no Ranking list at all.
+    """
+    parser = RankingParser()
+    parser.feed(raw)
+    entries, summary, raw = parser.close()
+
+    lookup = {f.lower(): f for f in filenames}
+    valid, problems = {}, {}
+    for entry in entries:
+        try:
+            entry = validate_entry(entry, lookup)
+        except ValueError as e:
+            filename = lookup.get(str(entry.get("resume_filename", "")).strip().lower()) if isinstance(entry, dict) else None
+            if filename is not None:
+                problems[filename] = str(e)
+            continue
+        valid.setdefault(entry["resume_filename"], entry)
+    for filename in filenames:
+        if filename not in valid:
+            problems.setdefault(filename, "missing from the LLM response")
+        else:
+            problems.pop(filename, None)
+    return valid, summary, problems
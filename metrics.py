@@ -0,0 +1,118 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Process-local stage timers and counters in the Prometheus text format. Under gunicorn each worker
+# exposes its own numbers; scrape every worker (or sum them) for the service total.
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+COUNTER_HELP = {
+    "screening_documents_total": "Documents received, by format",
+    "screening_bytes_total": "Uploaded document bytes, by format",
+    "screening_llm_tokens_total": "LLM tokens by direction (estimated at 4 chars/token when the provider reports none)",
+    "screening_llm_repairs_total": "Candidates re-requested from the LLM after a missing or malformed Ranking entry",
+    "screening_prompt_tokens_total": "Estimated resume tokens before (raw) and after (compacted, skill_evidence) prompt reduction",
+}
+
+
+_DONE = object()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+class Metrics:
+    """Thread-safe stage-latency histograms and labelled counters."""
+
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._stages = {}  # stage -> [bucket counts..., +Inf count, sum]
+        self._counters = {}  # (name, labels) -> value
+
+    def observe(self, stage, seconds, timings=None):
+        """Record one stage duration; also add it to a per-request timings dict when one is given."""
+        with self._lock:
+            hist = self._stages.setdefault(stage, [0] * (len(self.buckets) + 1) + [0.0])
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    hist[i] += 1
+            hist[-2] += 1
+            hist[-1] += seconds
+            if timings is not None:
+                timings[stage] = round(timings.get(stage, 0.0) + seconds, 6)
+
+    @contextmanager
+    def timer(self, stage, timings=None):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, timings)
+
+    def timed_iter(self, stage, iterable, timings=None):
+        # Times only the producer, not whatever the consumer does between items
+        total = 0.0
+        iterator = iter(iterable)
+        try:
+            while True:
+                started = time.perf_counter()
+                item = next(iterator, _DONE)
+                total += time.perf_counter() - started
+                if item is _DONE:
+                    return
+                yield item
+        finally:
+            self.observe(stage, total, timings)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def render(self, **gauge_groups):
+        """Prometheus text exposition. Each gauge group maps a label value to a stats() dict; numeric
+        fields become screening_<group>_<field>{name="<label value>"} gauges."""
+        with self._lock:
+            stages = {k: list(v) for k, v in self._stages.items()}
+            counters = dict(self._counters)
+
+        lines = [
+            "# HELP screening_stage_seconds Time spent in each screening stage",
+            "# TYPE screening_stage_seconds histogram",
+        ]
+        for stage, hist in sorted(stages.items()):
+            for bound, count in zip(self.buckets, hist):
+                lines.append(f"screening_stage_seconds_bucket{_labels([('stage', stage), ('le', bound)])} {count}")
+            lines.append(f"screening_stage_seconds_bucket{_labels([('stage', stage), ('le', '+Inf')])} {hist[-2]}")
+            lines.append(f"screening_stage_seconds_sum{_labels([('stage', stage)])} {hist[-1]}")
+            lines.append(f"screening_stage_seconds_count{_labels([('stage', stage)])} {hist[-2]}")
+
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# HELP {name} {COUNTER_HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for (counter, labels), value in sorted(counters.items()):
+                if counter == name:
+                    lines.append(f"{name}{_labels(labels)} {value}")
+
+        for group, sources in gauge_groups.items():
+            fields = {}
+            for source, stats in sources.items():
+                for field, value in stats.items():
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        fields.setdefault(field, []).append((source, value))
+            for field, values in sorted(fields.items()):
+                name = f"screening_{group}_{field}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.extend(f"{name}{_labels([('name', source)])} {value}" for source, value in values)
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
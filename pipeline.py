@@ -0,0 +1,317 @@
+import json
+import os
+
+from sentence_transformers import util
+
+from compaction import PROMPT_COMPACTION, PROMPT_MAX_RESUME_WORDS, compact_candidates, estimate_tokens
+from dedup import DEDUP_ENABLED, DEDUP_THRESHOLD, collapse_duplicates
+from embeddings import EMBEDDING_POOLING, POOLING_STRATEGIES, SBERT_BATCH_SIZE, encode_documents
+from extraction import iter_extract
+from metrics import metrics
+from render import EXPORT_FORMATS, add_summary_table
+from skills import SKILL_EVIDENCE, SKILL_EVIDENCE_MODES, apply_skill_evidence, build_skill_evidence, evidence_summary
+from vector_index import candidate_id
+from ranking import (
+    LLM_SHARD_SIZE,
+    LLM_TOP_K,
+    SBERT_MIN_SCORE,
+    LLMOutputError,
+    iter_shards,
+    merge_shard_results,
+    prefilter,
+)
+
+
+class PipelineError(Exception):
+    """Stops the screening pipeline with a JSON error body and an HTTP status."""
+
+    def __init__(self, body, status):
+        super().__init__(body.get("error"))
+        self.body = body
+        self.status = status
+
+
+def read_options(form):
+    """Per-request overrides of the pipeline settings, falling back to the environment defaults."""
+    min_score = form.get("min_sbert_score", SBERT_MIN_SCORE)
+    try:
+        options = {
+            "pooling": form.get("pooling", EMBEDDING_POOLING),
+            "batch_size": int(form.get("batch_size", SBERT_BATCH_SIZE)),
+            "top_k": int(form.get("top_k", LLM_TOP_K)),
+            "min_score": float(min_score) if min_score not in (None, "") else None,
+            "shard_size": int(form.get("shard_size", LLM_SHARD_SIZE)),
+            "compact": form.get("compact", str(PROMPT_COMPACTION)).lower() in ("1", "true", "yes"),
+            "max_resume_words": int(form.get("max_resume_words", PROMPT_MAX_RESUME_WORDS)),
+            "dedup": form.get("dedup", str(DEDUP_ENABLED)).lower() in ("1", "true", "yes"),
+            "dedup_threshold": float(form.get("dedup_threshold", DEDUP_THRESHOLD)),
+            "skill_evidence": form.get("skill_evidence", SKILL_EVIDENCE).lower(),
+            # Return the ranking as CSV or JSON lines instead of the JSON response (see render.py)
+            "export": form.get("export", "").lower() or None,
+            # Per-request stage breakdown (seconds) returned as "timings" when asked for
+            "timings": {} if form.get("timings", "").lower() in ("1", "true", "yes") else None,
+        }
+    except ValueError as e:
+        raise PipelineError({"error": f"Invalid option: {e}"}, 400)
+    if options["batch_size"] < 1:
+        raise PipelineError({"error": "batch_size must be at least 1"}, 400)
+    if options["pooling"] not in POOLING_STRATEGIES:
+        raise PipelineError({"error": f"pooling must be one of {', '.join(POOLING_STRATEGIES)}"}, 400)
+    if options["skill_evidence"] not in SKILL_EVIDENCE_MODES:
+        raise PipelineError({"error": f"skill_evidence must be one of {', '.join(SKILL_EVIDENCE_MODES)}"}, 400)
+    if options["export"] not in (None, *EXPORT_FORMATS):
+        raise PipelineError({"error": f"export must be one of {', '.join(EXPORT_FORMATS)}"}, 400)
+    return options
+
+
+def unique_names(uploads):
+    """(filename, bytes) uploads with clashing names renamed "resume (2).pdf", "resume (3).pdf", ...
+
+    Filenames key each candidate through the LLM prompt, its validation and the response, so two
+    different files both called resume.pdf must not share one.
+    """
+    seen, renamed = set(), []
+    for filename, data in uploads:
+        name, copy = filename, 1
+        stem, ext = os.path.splitext(filename)
+        while name.lower() in seen:  # the LLM's filenames are matched case-insensitively
+            copy += 1
+            name = f"{stem} ({copy}){ext}"
+        seen.add(name.lower())
+        renamed.append((name, data))
+    return renamed
+
+
+def score_candidates(model, cache, jd_text, results, options):
+    # Encode the JD once and all resumes in one batched pass (cached documents skip the encoder),
+    # then score with a single matrix op. Long documents are chunked and pooled when pooling is enabled.
+    texts = [jd_text] + [r["resume_text"] for r in results]
+    with metrics.timer("encode", options.get("timings")):
+        vecs = encode_documents(model, texts, cache, options["batch_size"], options["pooling"])
+    with metrics.timer("similarity", options.get("timings")):
+        sbert_scores = util.cos_sim(vecs[:1], vecs[1:])[0].tolist()
+
+    for r, sbert_score in zip(results, sbert_scores):
+        r["sbert_score"] = round(sbert_score, 3)
+    return vecs
+
+
+def run_pipeline(model, cache, jd_text, uploads, assess, options, llm_name, candidate_index=None):
+    """Extract, score, pre-filter and LLM-rank uploaded (filename, bytes) resumes.
+
+    Yields (event, payload) pairs as each stage produces results, ending with
+    ("result", response_data). Raises PipelineError when the request cannot be answered.
+    Resume embeddings are added to the candidate index, when one is given.
+    """
+    # Extract all resumes in parallel; files that fail or time out are reported instead of failing the batch
+    timings = options.get("timings")
+    uploads = unique_names(uploads)
+    results = []
+    failed = []
+    truncated = []
+    for (filename, _), extracted in zip(uploads, metrics.timed_iter("extract", iter_extract(uploads, timings=timings), timings)):
+        if extracted["error"]:
+            failed.append({"resume_name": filename, "error": extracted["error"]})
+            yield "extracted", failed[-1]
+            continue
+        results.append({"resume_name": filename, "resume_text": extracted["text"], "candidate_id": candidate_id(extracted["text"])})
+        event = {"resume_name": filename, "chars": len(extracted["text"])}
+        if extracted["truncated_pages"]:
+            # PDF pages past PDF_MAX_PAGES were not read
+            event["truncated_pages"] = extracted["truncated_pages"]
+            truncated.append({"resume_name": filename, "truncated_pages": extracted["truncated_pages"]})
+        yield "extracted", event
+
+    if not results:
+        raise PipelineError({"error": "Could not extract any resumes", "failed_resumes": failed}, 422)
+
+    # Collapse exact and near-duplicate resumes so each candidate is encoded and assessed once
+    if options["dedup"]:
+        with metrics.timer("dedup", timings):
+            results = collapse_duplicates(results, options["dedup_threshold"])
+        for r in results:
+            if r["aliases"]:
+                yield "deduplicated", {"resume_name": r["resume_name"], "aliases": r["aliases"]}
+
+    vecs = score_candidates(model, cache, jd_text, results, options)
+    if candidate_index is not None:
+        candidate_index.add((r["candidate_id"], r["resume_name"], vec) for r, vec in zip(results, vecs[1:]))
+    for r in results:
+        yield "scored", {"resume_name": r["resume_name"], "candidate_id": r["candidate_id"], "sbert_score": r["sbert_score"]}
+
+    # Only the top-K by SBERT score (and above the optional minimum) are sent to the LLM;
+    # the rest come back as screened-out Ranking entries
+    with metrics.timer("prefilter", timings):
+        shortlisted, screened_out = prefilter(results, options["top_k"], options["min_score"])
+    for entry in screened_out:
+        yield "screened_out", entry
+
+    # Compact the shortlisted resumes before they go into LLM prompts (see compaction.py)
+    prompt_tokens = None
+    if options["compact"] and shortlisted:
+        with metrics.timer("compact", timings):
+            prompt_tokens = compact_candidates(model, cache, vecs[0], shortlisted, options["max_resume_words"],
+                                               batch_size=options["batch_size"])
+        metrics.inc("screening_prompt_tokens_total", prompt_tokens["before"], stage="raw")
+        metrics.inc("screening_prompt_tokens_total", prompt_tokens["after"], stage="compacted")
+        yield "compacted", prompt_tokens
+
+    # Match the JD's required skills to each shortlisted resume's chunks (see skills.py); in "prompt"
+    # mode the LLM gets the evidence summary instead of the resume text
+    if options["skill_evidence"] != "off" and shortlisted:
+        with metrics.timer("skill_evidence", timings):
+            skills = build_skill_evidence(model, cache, jd_text, shortlisted, options["batch_size"])
+        if options["skill_evidence"] == "prompt" and skills:
+            before = prompt_tokens["before"] if prompt_tokens else sum(estimate_tokens(c["resume_text"]) for c in shortlisted)
+            for c in shortlisted:
+                c["prompt_text"] = evidence_summary(c)
+            prompt_tokens = {"before": before, "after": sum(estimate_tokens(c["prompt_text"]) for c in shortlisted)}
+            metrics.inc("screening_prompt_tokens_total", prompt_tokens["after"], stage="skill_evidence")
+        yield "skill_evidence", {"skills": skills, "mode": options["skill_evidence"]}
+
+    # LLM assessment, sharded and run concurrently for large uploads (see ranking.py)
+    def timed_assess(shard):
+        # Summed over shards, so with concurrent shards "llm_calls" can exceed the "llm" wall time
+        with metrics.timer("llm_calls", timings):
+            return assess(shard)
+
+    shard_results = []
+    for index, shard, output, error in metrics.timed_iter("llm", iter_shards(shortlisted, timed_assess, options["shard_size"]), timings):
+        shard_results.append((index, shard, output, error))
+        if error is None:
+            yield "shard", {"index": index, "Ranking": output["Ranking"], "Summary": output.get("Summary"), "failed": output.get("failed", [])}
+        else:
+            yield "shard_error", {"index": index, "resume_names": [c["resume_name"] for c in shard], "error": str(error)}
+
+    try:
+        data, llm_failed = merge_shard_results(shard_results, shortlisted)
+    except LLMOutputError as e:
+        raise PipelineError({"error": f"Invalid JSON from {llm_name}", "raw": e.raw, "exception": str(e)}, 500)
+    except Exception as e:
+        raise PipelineError({"error": f"{llm_name} API error", "exception": str(e)}, 500)
+    failed.extend(llm_failed)
+    if options["skill_evidence"] != "off":
+        apply_skill_evidence(data["Ranking"], shortlisted)
+    data["Ranking"].extend(screened_out)
+
+    duplicates = [{"resume_name": r["resume_name"], "aliases": r["aliases"]} for r in results if r.get("aliases")]
+    aliases = {d["resume_name"]: d["aliases"] for d in duplicates}
+    for entry in data["Ranking"]:
+        if entry.get("resume_filename") in aliases:
+            entry["aliases"] = aliases[entry["resume_filename"]]
+
+    try:
+        with metrics.timer("render", timings):
+            add_summary_table(data)
+    except Exception as e:
+        raise PipelineError({"error": f"Invalid JSON from {llm_name}", "raw": json.dumps(data), "exception": str(e)}, 500)
+
+    if failed:
+        data["failed_resumes"] = failed
+    if truncated:
+        data["truncated_resumes"] = truncated
+    if duplicates:
+        data["duplicates"] = duplicates
+    if prompt_tokens is not None:
+        data["prompt_tokens"] = prompt_tokens
+    if timings is not None:
+        data["timings"] = timings
+
+    yield "result", data
+
+
+def match_matrix(model, cache, jd_uploads, uploads, options, top_n=0, candidate_index=None):
+    """Score every uploaded resume against every uploaded JD by SBERT similarity.
+
+    Returns per-JD rankings and each candidate's best-fit JD. All JDs and resumes are
+    extracted in one parallel pass and encoded in one batch, so each document is encoded once.
+    """
+    timings = options.get("timings")
+    jd_uploads, uploads = unique_names(jd_uploads), unique_names(uploads)
+    failed_jobs, failed, truncated = [], [], []
+    jobs, results = [], []
+    extracted_all = metrics.timed_iter("extract", iter_extract(jd_uploads + uploads, timings=timings), timings)
+    for i, ((filename, _), extracted) in enumerate(zip(jd_uploads + uploads, extracted_all)):
+        is_job = i < len(jd_uploads)
+        if extracted["error"] and is_job:
+            failed_jobs.append({"job_name": filename, "error": extracted["error"]})
+        elif extracted["error"]:
+            failed.append({"resume_name": filename, "error": extracted["error"]})
+        elif is_job:
+            jobs.append({"job_name": filename, "job_text": extracted["text"]})
+        else:
+            results.append({"resume_name": filename, "resume_text": extracted["text"], "candidate_id": candidate_id(extracted["text"])})
+            if extracted["truncated_pages"]:
+                truncated.append({"resume_name": filename, "truncated_pages": extracted["truncated_pages"]})
+
+    if not jobs:
+        raise PipelineError({"error": "Could not extract any job descriptions", "failed_jobs": failed_jobs}, 422)
+    if not results:
+        raise PipelineError({"error": "Could not extract any resumes", "failed_resumes": failed}, 422)
+
+    texts = [j["job_text"] for j in jobs] + [r["resume_text"] for r in results]
+    with metrics.timer("encode", timings):
+        vecs = encode_documents(model, texts, cache, options["batch_size"], options["pooling"])
+    jd_vecs, resume_vecs = vecs[:len(jobs)], vecs[len(jobs):]
+    if candidate_index is not None:
+        candidate_index.add((r["candidate_id"], r["resume_name"], vec) for r, vec in zip(results, resume_vecs))
+
+    # (n_jobs, n_resumes) similarity matrix in a single op
+    with metrics.timer("similarity", timings):
+        sims = util.cos_sim(jd_vecs, resume_vecs).numpy()
+
+    rankings = []
+    for j, job in enumerate(jobs):
+        order = sims[j].argsort()[::-1]
+        if top_n > 0:
+            order = order[:top_n]
+        rankings.append({
+            "job_name": job["job_name"],
+            "Ranking": [
+                {"resume_name": results[r]["resume_name"], "candidate_id": results[r]["candidate_id"], "sbert_score": round(float(sims[j, r]), 3)}
+                for r in order
+            ],
+        })
+
+    best = sims.argmax(axis=0)
+    candidates = [
+        {
+            "resume_name": r["resume_name"],
+            "candidate_id": r["candidate_id"],
+            "best_job": jobs[best[i]]["job_name"],
+            "best_sbert_score": round(float(sims[best[i], i]), 3),
+            "scores": {job["job_name"]: round(float(sims[j, i]), 3) for j, job in enumerate(jobs)},
+        }
+        for i, r in enumerate(results)
+    ]
+
+    data = {"jobs": rankings, "candidates": candidates}
+    if failed_jobs:
+        data["failed_jobs"] = failed_jobs
+    if failed:
+        data["failed_resumes"] = failed
+    if truncated:
+        data["truncated_resumes"] = truncated
+    if timings is not None:
+        data["timings"] = timings
+    return data
+
+
+def pipeline_result(events):
+    for event, payload in events:
+        if event == "result":
+            return payload
+
+
+def sse_event(event, data):
+    # One Server-Sent Events frame; data is JSON so clients can JSON.parse(event.data)
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_events(events):
+    """Serialize pipeline events as Server-Sent Events; a PipelineError becomes a final "error" event."""
+    try:
+        for event, payload in events:
+            yield sse_event(event, payload)
+    except PipelineError as e:
+        yield sse_event("error", dict(e.body, status=e.status))
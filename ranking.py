@@ -0,0 +1,119 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Large uploads are split into shards that are assessed by the LLM concurrently and merged back
+# into one global ranking. 0 keeps the original single-call behaviour.
+LLM_SHARD_SIZE = int(os.environ.get("LLM_SHARD_SIZE", 0))
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 4))
+
+# SBERT pre-filter: only the top-K candidates (optionally above a minimum similarity) go to the LLM.
+# 0 / unset sends everyone, as before.
+LLM_TOP_K = int(os.environ.get("LLM_TOP_K", 0))
+SBERT_MIN_SCORE = float(os.environ["SBERT_MIN_SCORE"]) if os.environ.get("SBERT_MIN_SCORE") else None
+
+
+class LLMOutputError(ValueError):
+    """The LLM answered, but not with a usable ranking; keeps the raw text for the error response."""
+
+    def __init__(self, message, raw):
+        super().__init__(message)
+        self.raw = raw
+
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def shard(items, size):
+    if size <= 0 or len(items) <= size:
+        return [items]
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def prefilter(candidates, top_k=LLM_TOP_K, min_score=SBERT_MIN_SCORE):
+    """Split candidates into (shortlisted, screened_out) by SBERT score; screened_out are Ranking-shaped entries."""
+    ordered = sorted(candidates, key=lambda c: c["sbert_score"], reverse=True)
+    shortlisted, screened_out = [], []
+    for c in ordered:
+        if min_score is not None and c["sbert_score"] < min_score:
+            reason = f"SBERT similarity {c['sbert_score']} is below the minimum of {min_score}"
+        elif top_k > 0 and len(shortlisted) >= top_k:
+            reason = f"SBERT similarity {c['sbert_score']} is outside the top {top_k}"
+        else:
+            shortlisted.append(c)
+            continue
+        screened_out.append({
+            "name": c["resume_name"],
+            "sbert_score": c["sbert_score"],
+            "fitment_score": 0,
+            "selection": False,
+            "rationale": f"Screened out before LLM assessment: {reason}.",
+            "skill_gap_table": [],
+            "experience_summary": "",
+            "skill_presence": {},
+            "suggested_domains": [],
+            "resume_filename": c["resume_name"],
+            "screened_out": True,
+        })
+    if top_k <= 0 and min_score is None:
+        return candidates, []  # keep upload order when the pre-filter is off
+    return shortlisted, screened_out
+
+
+def merge_rankings(outputs, candidates):
+    """Merge per-shard {"Ranking", "Summary"} outputs into one ranking ordered by fitment, then SBERT score."""
+    sbert_scores = {c["resume_name"]: c["sbert_score"] for c in candidates}
+    ranking = [entry for output in outputs for entry in output.get("Ranking", [])]
+    ranking.sort(
+        key=lambda entry: (
+            _as_float(entry.get("fitment_score")),
+            _as_float(sbert_scores.get(entry.get("resume_filename"), entry.get("sbert_score"))),
+        ),
+        reverse=True,
+    )
+    summary = " ".join(output["Summary"].strip() for output in outputs if output.get("Summary"))
+    return {"Ranking": ranking, "Summary": summary}
+
+
+def iter_shards(candidates, assess, shard_size=LLM_SHARD_SIZE, max_concurrency=LLM_MAX_CONCURRENCY):
+    """Run assess(shard) -> {"Ranking", "Summary"} over shards of candidates on a bounded thread pool,
+    yielding (index, shard, output, error) for each shard as soon as its assessment finishes."""
+    if not candidates:
+        return
+    shards = shard(candidates, shard_size)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(shards)))) as executor:
+        futures = {executor.submit(assess, s): (i, s) for i, s in enumerate(shards)}
+        for future in as_completed(futures):
+            i, s = futures[future]
+            try:
+                yield i, s, future.result(), None
+            except Exception as e:
+                yield i, s, None, e
+
+
+def merge_shard_results(shard_results, candidates):
+    """Combine iter_shards results into (data, failed), where failed lists the candidates of shards
+    whose assessment raised. If every shard fails the first error is re-raised, matching the
+    single-call behaviour; a single shard's output is returned as the LLM ranked it."""
+    if not shard_results:
+        return {"Ranking": [], "Summary": ""}, []
+
+    outputs = []
+    failed = []
+    first_error = None
+    for _, s, output, error in sorted(shard_results, key=lambda r: r[0]):
+        if error is None:
+            failed.extend(output.pop("failed", []))  # candidates the LLM never returned a valid entry for
+            outputs.append(output)
+            continue
+        first_error = first_error or error
+        failed.extend({"resume_name": c["resume_name"], "error": f"LLM assessment failed: {error}"} for c in s)
+
+    if not outputs:
+        raise first_error
+    if len(shard_results) == 1:
+        return outputs[0], failed
+    return merge_rankings(outputs, candidates), failed
@@ -0,0 +1,82 @@
+import csv
+import io
+import json
+from html import escape
+
+# Result rendering without pandas: the ranking table is written straight to escaped HTML (same
+# markup as the DataFrame.to_html table it replaces), and the full ranking can be exported as
+# CSV or JSON lines.
+EXPORT_FORMATS = {"csv": "text/csv; charset=utf-8", "jsonl": "application/x-ndjson"}
+TABLE_COLUMNS = ("Rank", "Candidate Name", "Fitment Score", "Decision", "Notes")
+
+
+def _table_row(rank, candidate):
+    return (
+        rank,
+        candidate["name"],
+        f"{candidate['fitment_score']} / 10",
+        "✅ Selected" if candidate["selection"] else "❌ Rejected",
+        candidate["rationale"],
+    )
+
+
+def iter_ranking_table(ranking):
+    """HTML of the five-column ranking table, piece by piece; every cell is escaped."""
+    yield '<table border="1" class="dataframe ranking-table">\n  <thead>\n    <tr style="text-align: right;">\n'
+    for column in TABLE_COLUMNS:
+        yield f"      <th>{column}</th>\n"
+    yield "    </tr>\n  </thead>\n  <tbody>\n"
+    for rank, candidate in enumerate(ranking, start=1):
+        yield "    <tr>\n"
+        for value in _table_row(rank, candidate):
+            yield f"      <td>{escape(str(value))}</td>\n"
+        yield "    </tr>\n"
+    yield "  </tbody>\n</table>"
+
+
+def add_summary_table(data): #placing the ranking table in the summary section
+    data["Summary"] = f"""
+        <div>
+            <h3>Ranked Candidates</h3>
+            {"".join(iter_ranking_table(data["Ranking"]))}
+            <p><strong>Note:</strong> {escape(data['Summary'])}</p>
+        </div>
+        """
+    return data
+
+
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _cell(value):
+    # Nested fields (skill tables, domain lists) are kept as JSON inside their CSV cell
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        # Filenames and LLM text are untrusted: a leading ' stops spreadsheets running them as formulas
+        return "'" + value
+    return "" if value is None else value
+
+
+def ranking_csv(ranking):
+    """The full ranking as CSV: one row per candidate, columns in first-seen key order."""
+    columns = ["rank"]
+    for entry in ranking:
+        columns.extend(key for key in entry if key not in columns)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(columns)
+    for rank, entry in enumerate(ranking, start=1):
+        writer.writerow([rank] + [_cell(entry.get(key)) for key in columns[1:]])
+    return out.getvalue()
+
+
+def ranking_jsonl(ranking):
+    """The full ranking as JSON lines, one candidate per line with its rank."""
+    return "".join(json.dumps(dict(entry, rank=rank), ensure_ascii=False) + "\n" for rank, entry in enumerate(ranking, start=1))
+
+
+def export_ranking(data, fmt):
+    """(body, mimetype) of a pipeline result's ranking in one of EXPORT_FORMATS."""
+    body = ranking_csv(data["Ranking"]) if fmt == "csv" else ranking_jsonl(data["Ranking"])
+    return body, EXPORT_FORMATS[fmt]
@@ -43,11 +43,11 @@ def resume_fitment(resume_filepath, jd_filepath):
 
     
     if ".pdf" in resume_filepath:
-        filepath = pathlib.Path(resume_filepath)
-        resume_part = types.Part.from_bytes(data=filepath.read_bytes(), mime_type="application/pdf")
+        resume_bytes = pathlib.Path(resume_filepath).read_bytes()
+        resume_part = types.Part.from_bytes(data=resume_bytes, mime_type="application/pdf")
 
         # used for semantic embeddings comparison
-        doc = fitz.open(resume_filepath)
+        doc = fitz.open(stream=resume_bytes, filetype="pdf")  # same buffer as the Gemini part
         resume_text = ""
         for page in doc:
             resume_text += page.get_text()
@@ -57,11 +57,11 @@ def resume_fitment(resume_filepath, jd_filepath):
         resume_part = types.Part.from_text(text=resume_text)
 
     if ".pdf" in jd_filepath:
-        filepath = pathlib.Path(jd_filepath)
-        jd_part = types.Part.from_bytes(data=filepath.read_bytes(), mime_type="application/pdf")
+        jd_bytes = pathlib.Path(jd_filepath).read_bytes()
+        jd_part = types.Part.from_bytes(data=jd_bytes, mime_type="application/pdf")
         
         # used for semantic embeddings comparison
-        doc_jd = fitz.open(jd_filepath)
+        doc_jd = fitz.open(stream=jd_bytes, filetype="pdf")  # same buffer as the Gemini part
         jd_text = ""
         for page in doc_jd:
             jd_text += page.get_text()
@@ -0,0 +1,175 @@
+import os
+
+from flask import Blueprint, Response, request, jsonify
+
+import encoder
+from embeddings import EmbeddingCache, encode_documents
+from extraction import extraction_cache
+from jobs import JobQueue
+from llm_backends import assess_shard
+from llm_cache import llm_cache
+from metrics import metrics
+from pipeline import PipelineError, match_matrix, pipeline_result, read_options, run_pipeline, stream_events
+from render import EXPORT_FORMATS, export_ranking
+from vector_index import CandidateIndex
+
+# Routes shared by the ranking apps (multiv2.py, multi_upload_app.py), and the state behind them.
+# Each app registers screening_blueprint() with its own LLM backend, prompt and JD reader.
+
+os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+model = encoder.preload()
+embedding_cache = EmbeddingCache(encoder.cache_name())
+job_queue = JobQueue()
+candidate_index = CandidateIndex()  # every scored resume, searchable by JD later
+
+
+def screening_blueprint(llm, ranking_prompt, llm_name, extract_text_and_part, message):
+    """Blueprint with the screening, job, matching, search and monitoring routes.
+
+    extract_text_and_part(filename, bytes) -> (text, part) reads a JD; the part (when not None) is
+    what the LLM gets instead of the JD text. message is the health check's greeting.
+    """
+    bp = Blueprint("screening", __name__)
+
+    def start_pipeline(options): #reads the uploads while the request is live; the returned generator does the work
+        job_file = request.files['job']
+        jd_text, jd_part = extract_text_and_part(job_file.filename, job_file.read())
+        jd = jd_text if jd_part is None else jd_part
+        uploads = [(resume_file.filename, resume_file.read()) for resume_file in request.files.getlist('resumes')]
+        return run_pipeline(model, embedding_cache, jd_text, uploads, lambda shard: assess_shard(llm, ranking_prompt, jd, shard), options, llm_name, candidate_index)
+
+    @bp.route('/score_resumes_ranked', methods=['POST'])
+    def score_resumes_ranked():
+        if 'resumes' not in request.files or 'job' not in request.files:
+            return jsonify({"error": "Missing files"}), 400
+
+        try:
+            options = read_options(request.form)
+            data = pipeline_result(start_pipeline(options))
+        except PipelineError as e:
+            return jsonify(e.body), e.status
+
+        if options["export"]: # export=csv|jsonl returns just the ranking in that format
+            body, mimetype = export_ranking(data, options["export"])
+            return Response(body, mimetype=mimetype)
+        return jsonify(data)
+
+    @bp.route('/score_resumes_ranked/stream', methods=['POST'])
+    def score_resumes_ranked_stream(): #same pipeline, with per-resume and per-shard results pushed as Server-Sent Events
+        if 'resumes' not in request.files or 'job' not in request.files:
+            return jsonify({"error": "Missing files"}), 400
+
+        try:
+            events = start_pipeline(read_options(request.form))
+        except PipelineError as e:
+            return jsonify(e.body), e.status
+
+        return Response(
+            stream_events(events),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}  # keep proxies from buffering the stream
+        )
+
+    @bp.route('/jobs', methods=['POST'])
+    def submit_job(): #background variant of /score_resumes_ranked: returns a job id to poll instead of holding the request open
+        if 'resumes' not in request.files or 'job' not in request.files:
+            return jsonify({"error": "Missing files"}), 400
+
+        try:
+            events = start_pipeline(read_options(request.form))
+        except PipelineError as e:
+            return jsonify(e.body), e.status
+
+        job_id = job_queue.submit(events, total=len(request.files.getlist('resumes')))
+        return jsonify({"job_id": job_id, "status_url": f"/jobs/{job_id}"}), 202
+
+    @bp.route('/jobs/<job_id>')
+    def job_status(job_id): #status, progress counts, partial results, and the final ranking once done
+        job = job_queue.store.get(job_id)
+        if job is None:
+            return jsonify({"error": "Unknown job"}), 404
+        export = request.args.get("export")
+        if export: # ?export=csv|jsonl returns the finished ranking in that format
+            if export not in EXPORT_FORMATS:
+                return jsonify({"error": f"export must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+            if job["status"] != "done":
+                return jsonify({"error": "Job is not done", "status": job["status"]}), 409
+            body, mimetype = export_ranking(job["result"], export)
+            return Response(body, mimetype=mimetype)
+        return jsonify(job)
+
+    @bp.route('/match_matrix', methods=['POST'])
+    def score_match_matrix(): #several JDs x several resumes in one call: per-JD rankings and each candidate's best-fit JD (SBERT only)
+        if 'resumes' not in request.files or 'jobs' not in request.files:
+            return jsonify({"error": "Missing files"}), 400
+
+        try:
+            options = read_options(request.form)
+            top_n = int(request.form.get("top_n", 0))
+        except PipelineError as e:
+            return jsonify(e.body), e.status
+        except ValueError as e:
+            return jsonify({"error": f"Invalid option: {e}"}), 400
+
+        jd_uploads = [(job_file.filename, job_file.read()) for job_file in request.files.getlist('jobs')]
+        uploads = [(resume_file.filename, resume_file.read()) for resume_file in request.files.getlist('resumes')]
+        try:
+            data = match_matrix(model, embedding_cache, jd_uploads, uploads, options, top_n, candidate_index)
+        except PipelineError as e:
+            return jsonify(e.body), e.status
+
+        return jsonify(data)
+
+    @bp.route('/search_candidates', methods=['POST'])
+    def search_candidates(): #top-N previously scored resumes most similar to a JD, without re-uploading or re-parsing them
+        if 'job' not in request.files:
+            return jsonify({"error": "Missing files"}), 400
+
+        try:
+            options = read_options(request.form)
+            top_n = int(request.form.get("top_n", 10))
+        except PipelineError as e:
+            return jsonify(e.body), e.status
+        except ValueError as e:
+            return jsonify({"error": f"Invalid option: {e}"}), 400
+        if top_n < 1:
+            return jsonify({"error": "top_n must be at least 1"}), 400
+
+        job_file = request.files['job']
+        jd_text, _ = extract_text_and_part(job_file.filename, job_file.read())
+        jd_vec = encode_documents(model, [jd_text], embedding_cache, pooling=options["pooling"])[0]
+
+        return jsonify({
+            "candidates": candidate_index.search(jd_vec, top_n),
+            "indexed": len(candidate_index)
+        })
+
+    @bp.route('/candidates/<candidate_id>', methods=['DELETE'])
+    def delete_candidate(candidate_id):
+        if not candidate_index.delete(candidate_id):
+            return jsonify({"error": "Unknown candidate"}), 404
+        return jsonify({"deleted": candidate_id})
+
+    @bp.route('/cache_stats')
+    def cache_stats(): # hit/miss counters for sizing the caches
+        return jsonify({
+            "extraction": extraction_cache.stats(),
+            "embeddings": embedding_cache.stats(),
+            "llm": llm_cache.stats(),
+            "llm_backend": llm.stats()
+        })
+
+    @bp.route('/metrics')
+    def prometheus_metrics(): #stage timers, document/token counters and cache stats in the Prometheus text format
+        return Response(metrics.render(
+            cache={"extraction": extraction_cache.stats(), "embeddings": embedding_cache.stats(), "llm": llm_cache.stats()},
+            llm_backend={llm.name: llm.stats()},
+        ), mimetype="text/plain; version=0.0.4")
+
+    @bp.route('/')
+    def home(): #health check; 503 until the encoder is loaded and warmed up
+        status = encoder.status()
+        return jsonify(dict(status, message=message)), 200 if status["ready"] else 503
+
+    return bp
@@ -0,0 +1,160 @@
+import os
+import re
+from functools import lru_cache
+
+import numpy as np
+
+from embeddings import _section_of, chunk_text, encode_texts
+
+# Deterministic skill evidence: required skills are pulled from the JD, every resume is split into
+# small chunks that are embedded once, and each skill is matched to its best chunk per candidate.
+#   off    - not computed
+#   table  - skill_presence / skill_gap_table in the ranking are filled from the evidence
+#   prompt - as table, and the LLM gets the evidence summary instead of the full resume text
+SKILL_EVIDENCE_MODES = ("off", "table", "prompt")
+SKILL_EVIDENCE = os.environ.get("SKILL_EVIDENCE", "off")
+SKILL_MATCH_THRESHOLD = float(os.environ.get("SKILL_MATCH_THRESHOLD", 0.55))
+SKILL_CHUNK_WORDS = int(os.environ.get("SKILL_CHUNK_WORDS", 60))
+SKILL_CHUNK_OVERLAP = int(os.environ.get("SKILL_CHUNK_OVERLAP", 20))
+MAX_JD_SKILLS = int(os.environ.get("MAX_JD_SKILLS", 25))
+SUMMARY_CONTEXT_WORDS = 150
+
+SKILL_VOCAB = (
+    "Python", "Java", "JavaScript", "TypeScript", "C++", "C#", "Go", "Rust", "Scala", "Kotlin", "Swift", "PHP", "Ruby", "R",
+    "SQL", "PL/SQL", "NoSQL", "PostgreSQL", "MySQL", "Oracle", "SQL Server", "MongoDB", "Cassandra", "Redis", "Elasticsearch",
+    "Spark", "PySpark", "Hadoop", "Hive", "Kafka", "Airflow", "dbt", "Snowflake", "Databricks", "BigQuery", "Redshift",
+    "ETL", "Data Warehousing", "Data Modeling", "Pandas", "NumPy", "Scikit-learn", "TensorFlow", "PyTorch", "Keras",
+    "Machine Learning", "Deep Learning", "NLP", "Computer Vision", "LLM", "Generative AI", "Statistics",
+    "Tableau", "Power BI", "Excel", "Looker",
+    "AWS", "Azure", "GCP", "Docker", "Kubernetes", "Terraform", "Ansible", "Jenkins", "GitHub Actions", "CI/CD", "DevOps",
+    "Linux", "Git", "REST", "RESTful API", "GraphQL", "Microservices", "gRPC",
+    "React", "Angular", "Vue", "Node.js", "Express", "Django", "Flask", "FastAPI", "Spring", "Spring Boot", ".NET",
+    "HTML", "CSS", "Selenium", "JUnit", "pytest", "Agile", "Scrum", "JIRA", "SAP", "Salesforce", "ServiceNow",
+)
+
+# Skills that are ordinary words even in their own casing ("Go the extra mile", "Excel in", "R&D",
+# "Swift delivery", a candidate called Ruby) only count in a list or skill context: "Python, Go and
+# SQL", "in Go", "Swift developer", "Advanced Excel, PowerPoint"
+AMBIGUOUS_SKILLS = {"Go", "R", "Swift", "Excel", "Spring", "Express", "Ruby"}
+# Skills that are only ordinary words in lower case ("rest", "react", "spark") count as a whole word
+# in their own casing anywhere: "Apache Spark", "SAP HANA", "REST APIs", "React Native"
+CASE_SENSITIVE_SKILLS = {"SAP", "REST", "Oracle", "Spark", "React", "Angular", "Hive", "Git", "Looker", "Rust", "Vue"}
+_LIST_BEFORE = r"(?:^|[,;/|(•:.*-]|\b(?:and|or|with|in|of|using|including))[ \t]*"
+_LIST_AFTER = r"[ \t]*(?=$|[,;/|)•.]|\b(?:and|or|developers?|engineers?|programming|language|experience)\b)"
+
+_NOT_A_SKILL = re.compile(r"\b(?:years?|experience|ability|strong|good|excellent|degree|bachelor|master|must|should|will|we|you)\b", re.IGNORECASE)
+_PREFIX = re.compile(r"^(?:hands[- ]on|experience (?:in|with)|knowledge of|proficien(?:cy|t) (?:in|with)|familiarity with|expertise in)\s+", re.IGNORECASE)
+
+
+@lru_cache(maxsize=None)
+def _mention(skill):
+    if skill in AMBIGUOUS_SKILLS:
+        name = re.escape(skill)
+        return re.compile(
+            f"{_LIST_BEFORE}({name}){_LIST_AFTER}|(?<![\\w+#.&-])({name})[ \\t]*(?=[,;/|)•])", re.MULTILINE
+        )
+    flags = 0 if skill in CASE_SENSITIVE_SKILLS else re.IGNORECASE
+    return re.compile(r"(?<![\w+#.])(" + re.escape(skill) + r")(?![\w+#])", flags)
+
+
+def extract_required_skills(jd_text, max_skills=MAX_JD_SKILLS):
+    """Known skills mentioned anywhere in the JD, then short list items from its requirements/skills sections."""
+    skills = [s for s in SKILL_VOCAB if _mention(s).search(jd_text or "")]
+    section = None
+    for line in (jd_text or "").splitlines():
+        section = _section_of(line) or section
+        if section not in ("requirements", "skills") or _section_of(line):
+            continue
+        for item in re.split(r"[,;•|/]|\band\b", line):
+            item = _PREFIX.sub("", item.strip(" \t-*.:()"))
+            if item and len(item.split()) <= 3 and not _NOT_A_SKILL.search(item):
+                skills.append(item)
+
+    unique = {}
+    for skill in skills:
+        unique.setdefault(skill.lower(), skill)
+    return list(unique.values())[:max_skills]
+
+
+def _snippet(text, skill, fallback, words=12):
+    match = _mention(skill).search(text)
+    if not match:
+        return " ".join(fallback.split()[:2 * words])
+    group = match.lastindex  # the alternative that matched holds the skill
+    before, after = text[:match.start(group)], text[match.end(group):]
+    return (
+        " ".join(before.split()[-words:]) + (" " if before[-1:].isspace() else "")
+        + match.group(group)
+        + (" " if after[:1].isspace() else "") + " ".join(after.split()[:words])
+    ).strip()
+
+
+def build_skill_evidence(model, cache, jd_text, candidates, batch_size=32, threshold=SKILL_MATCH_THRESHOLD):
+    """Set c["skill_evidence"] = [{"skill", "present", "similarity", "evidence"}] on every candidate.
+
+    The JD skills and every chunk of every candidate are encoded in one batch; a skill is present when
+    the resume names it or its best chunk is at least `threshold` similar.
+    """
+    skills = extract_required_skills(jd_text)
+    if not skills or not candidates:
+        for c in candidates:
+            c["skill_evidence"] = []
+        return skills
+
+    texts = [c.get("prompt_text", c["resume_text"]) for c in candidates]
+    chunks = [[chunk for chunk, _ in chunk_text(t, SKILL_CHUNK_WORDS, SKILL_CHUNK_OVERLAP)] for t in texts]
+    vecs = encode_texts(model, skills + [chunk for cs in chunks for chunk in cs], cache, batch_size)
+    vecs = vecs / np.maximum(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12)
+    sims = vecs[:len(skills)] @ vecs[len(skills):].T  # (skills, all chunks)
+
+    start = 0
+    for c, text, cs in zip(candidates, texts, chunks):
+        block = sims[:, start:start + len(cs)]
+        best = block.argmax(axis=1)
+        scores = block[np.arange(len(skills)), best]
+        c["skill_evidence"] = [
+            {
+                "skill": skill,
+                "present": bool(_mention(skill).search(text)) or bool(score >= threshold),
+                "similarity": round(float(score), 3),
+                "evidence": _snippet(text, skill, cs[chunk]),
+            }
+            for skill, chunk, score in zip(skills, best, scores)
+        ]
+        start += len(cs)
+    return skills
+
+
+def evidence_summary(candidate, context_words=SUMMARY_CONTEXT_WORDS):
+    """Compact prompt text: per-skill evidence plus the opening of the resume."""
+    lines = ["Skill evidence (required skill: present, similarity, best-matching excerpt):"]
+    for e in candidate["skill_evidence"]:
+        lines.append(f"- {e['skill']}: {'yes' if e['present'] else 'no'} ({e['similarity']}) \"{e['evidence']}\"")
+    text = candidate.get("prompt_text", candidate["resume_text"])
+    lines += ["Resume opening:", " ".join(text.split()[:context_words])]
+    return "\n".join(lines)
+
+
+def apply_skill_evidence(ranking, candidates):
+    """Replace the LLM's skill_presence / skill_gap_table with the evidence, keeping its depth ratings."""
+    evidence = {c["resume_name"]: c["skill_evidence"] for c in candidates if c.get("skill_evidence")}
+    for entry in ranking:
+        rows = evidence.get(entry.get("resume_filename"))
+        if not rows:
+            continue
+        depths = {
+            str(row.get("skill", "")).lower(): row.get("depth")
+            for row in entry.get("skill_gap_table") or [] if isinstance(row, dict)
+        }
+        entry["skill_presence"] = {e["skill"]: e["present"] for e in rows}
+        entry["skill_gap_table"] = [
+            {
+                "skill": e["skill"],
+                "required": True,
+                "present": e["present"],
+                "depth": depths.get(e["skill"].lower()) if e["present"] else None,
+                "similarity": e["similarity"],
+                "evidence": e["evidence"] if e["present"] else None,
+            }
+            for e in rows
+        ]
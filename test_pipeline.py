@@ -0,0 +1,39 @@
+import fitz
+import numpy as np
+
+from llm_backends import FakeBackend, assess_shard
+from pipeline import pipeline_result, read_options, unique_names, run_pipeline
+
+
+class WordCountModel:
+    # Deterministic stand-in for the SBERT encoder: a bag-of-words vector per text
+    VOCAB = ("python", "java", "sql", "aws", "react", "developer", "engineer", "data")
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, **kwargs):
+        return np.array([[text.lower().count(w) + 0.1 for w in self.VOCAB] for text in texts], dtype=np.float32)
+
+
+def make_pdf(text):
+    doc = fitz.open()
+    doc.new_page().insert_text((50, 72), text)
+    return doc.tobytes()
+
+
+def test_unique_names_renames_clashes_in_upload_order():
+    uploads = [("resume.pdf", b"1"), ("Resume.pdf", b"2"), ("cv.docx", b"3"), ("resume.pdf", b"4")]
+    assert [name for name, _ in unique_names(uploads)] == ["resume.pdf", "Resume (2).pdf", "cv.docx", "resume (3).pdf"]
+
+
+def test_same_filename_candidates_are_all_ranked():
+    # Three different candidates who all uploaded "resume.pdf" each get their own Ranking entry
+    texts = ["Python developer with SQL and AWS", "Java engineer building data pipelines", "React developer"]
+    uploads = [("resume.pdf", make_pdf(text)) for text in texts]
+    options = read_options({"dedup": "0"})
+    backend = FakeBackend(latency=0, error_rate=0)
+    data = pipeline_result(run_pipeline(
+        WordCountModel(), None, "Python developer, SQL, AWS", uploads,
+        lambda shard: assess_shard(backend, "Rank these resumes.", "Python developer, SQL, AWS", shard),
+        options, "fake",
+    ))
+    assert sorted(entry["resume_filename"] for entry in data["Ranking"]) == ["resume (2).pdf", "resume (3).pdf", "resume.pdf"]
+    assert "failed_resumes" not in data
@@ -0,0 +1,217 @@
+import fcntl
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import numpy as np
+
+from embeddings import normalize_text
+
+# Every scored resume's embedding is kept in a memory-mapped float32 matrix with SQLite metadata,
+# so past candidates can be searched by JD without re-uploading or re-parsing anything
+VECTOR_INDEX_DIR = os.environ.get("VECTOR_INDEX_DIR", "/tmp/candidate_index")
+VECTOR_INDEX_ANN_MIN = int(os.environ.get("VECTOR_INDEX_ANN_MIN", 50000))  # rows before an IVF index is built; 0 = never
+VECTOR_INDEX_NPROBE = int(os.environ.get("VECTOR_INDEX_NPROBE", 8))
+
+
+def candidate_id(text):
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()[:32]
+
+
+def _normalize(vecs):
+    vecs = np.asarray(vecs, dtype=np.float32)
+    return vecs / np.maximum(np.linalg.norm(vecs, axis=-1, keepdims=True), 1e-12)
+
+
+class _IVF:
+    """Coarse k-means quantizer: a query only scores the rows in its nprobe closest clusters."""
+
+    def __init__(self, matrix, rows, n_iter=10, sample=20000, chunk=8192):
+        rng = np.random.default_rng(0)
+        n_lists = max(1, int(np.sqrt(len(rows))))
+        train = matrix[np.sort(rng.choice(rows, size=min(sample, len(rows)), replace=False))]
+        centroids = train[rng.choice(len(train), size=n_lists, replace=False)]
+        for _ in range(n_iter):
+            assign = np.argmax(train @ centroids.T, axis=1)
+            for k in range(n_lists):
+                members = train[assign == k]
+                if len(members):
+                    centroids[k] = members.mean(axis=0)
+            centroids = _normalize(centroids)
+
+        assign = np.concatenate([np.argmax(matrix[rows[i:i + chunk]] @ centroids.T, axis=1) for i in range(0, len(rows), chunk)])
+        self.centroids = centroids
+        self.lists = [rows[assign == k] for k in range(n_lists)]
+        self.built_rows = len(rows)
+        self.max_row = int(rows.max())
+
+    def probe(self, q, nprobe):
+        nearest = np.argsort(-(self.centroids @ q))[:nprobe]
+        return np.concatenate([self.lists[k] for k in nearest])
+
+
+class CandidateIndex:
+    """Persistent nearest-neighbour index of candidate embeddings supporting incremental inserts and deletes."""
+
+    def __init__(self, directory=VECTOR_INDEX_DIR, ann_min_rows=VECTOR_INDEX_ANN_MIN, nprobe=VECTOR_INDEX_NPROBE):
+        os.makedirs(directory, exist_ok=True)
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.lock_path = os.path.join(directory, "write.lock")
+        self.ann_min_rows = ann_min_rows
+        self.nprobe = nprobe
+        self.db_path = os.path.join(directory, "candidates.sqlite3")
+        self._pid = None
+        self._connection = None
+        self._lock = threading.Lock()
+        with closing(sqlite3.connect(self.db_path)) as db, db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS candidates "
+                "(id TEXT PRIMARY KEY, row INTEGER NOT NULL, resume_name TEXT, added_at REAL NOT NULL)"
+            )
+            db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            dim = db.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        self.dim = int(dim[0]) if dim else None
+        self._loaded_version = None
+        self._file_id = None
+        self._mmap = None
+        self._ivf = None
+        self._ids = []
+        self._names = []
+        self._added = []
+        self._rows = np.zeros(0, dtype=np.int64)
+
+    @property
+    def _db(self):
+        # One connection per process, opened on first use (see JobStore._conn)
+        if self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._pid = os.getpid()
+        return self._connection
+
+    def _write_lock(self):
+        f = open(self.lock_path, "a")
+        fcntl.flock(f, fcntl.LOCK_EX)
+        return f  # closing the file releases the lock
+
+    def _data_version(self):
+        # Changes whenever another connection (e.g. a sibling worker) commits
+        return self._db.execute("PRAGMA data_version").fetchone()[0]
+
+    def _load(self):
+        version = (self._data_version(), os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0)
+        if version == self._loaded_version:
+            return
+        if self.dim is None:
+            dim = self._db.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+            self.dim = int(dim[0]) if dim else None
+        records = self._db.execute("SELECT id, row, resume_name, added_at FROM candidates ORDER BY row").fetchall()
+        self._ids = [r[0] for r in records]
+        self._rows = np.array([r[1] for r in records], dtype=np.int64)
+        self._names = [r[2] for r in records]
+        self._added = [r[3] for r in records]
+
+        stat = os.stat(self.vectors_path) if records else None
+        if stat is not None and (self._file_id != (stat.st_ino, stat.st_size)):
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(stat.st_size // (4 * self.dim), self.dim))
+            if self._file_id is None or self._file_id[0] != stat.st_ino:
+                self._ivf = None  # rows were renumbered by compact()
+            self._file_id = (stat.st_ino, stat.st_size)
+        self._loaded_version = version
+
+    def add(self, candidates):
+        """Insert (candidate_id, resume_name, vector) triples; ids already in the index are skipped."""
+        candidates = list(candidates)
+        if not candidates:
+            return 0
+        with self._lock, self._write_lock():
+            existing = {row[0] for row in self._db.execute(
+                f"SELECT id FROM candidates WHERE id IN ({','.join('?' * len(candidates))})", [c[0] for c in candidates]
+            )}
+            new = {}
+            for cid, name, vec in candidates:
+                if cid not in existing:
+                    new[cid] = (name, vec)
+            if not new:
+                return 0
+            vecs = _normalize([vec for _, vec in new.values()])
+            if self.dim is None:
+                self.dim = vecs.shape[1]
+                with self._db:
+                    self._db.execute("INSERT OR REPLACE INTO meta VALUES ('dim', ?)", (str(self.dim),))
+            with open(self.vectors_path, "ab") as f:
+                start = f.tell() // (4 * self.dim)
+                f.write(vecs.tobytes())
+            now = time.time()
+            with self._db:
+                self._db.executemany(
+                    "INSERT INTO candidates (id, row, resume_name, added_at) VALUES (?, ?, ?, ?)",
+                    [(cid, start + i, name, now) for i, (cid, (name, _)) in enumerate(new.items())],
+                )
+            self._loaded_version = None
+        return len(new)
+
+    def delete(self, cid):
+        with self._lock, self._write_lock():
+            with self._db:
+                deleted = self._db.execute("DELETE FROM candidates WHERE id = ?", (cid,)).rowcount
+            self._loaded_version = None
+            live = self._db.execute("SELECT COUNT(*) FROM candidates").fetchone()[0]
+            total_rows = os.path.getsize(self.vectors_path) // (4 * self.dim) if self.dim and os.path.exists(self.vectors_path) else 0
+            if total_rows > 1000 and live < total_rows // 2:
+                self._compact()
+        return bool(deleted)
+
+    def _compact(self):
+        # Rewrite the matrix without deleted rows; caller holds both locks
+        self._load()
+        tmp_path = self.vectors_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            for start in range(0, len(self._rows), 8192):
+                f.write(np.ascontiguousarray(self._mmap[self._rows[start:start + 8192]]).tobytes())
+        with self._db:
+            self._db.executemany("UPDATE candidates SET row = ? WHERE id = ?", [(i, cid) for i, cid in enumerate(self._ids)])
+        os.replace(tmp_path, self.vectors_path)
+        self._loaded_version = None
+        self._ivf = None
+
+    def search(self, query_vec, top_n=10):
+        """Top-N candidates by cosine similarity to query_vec."""
+        if top_n < 1:
+            raise ValueError(f"top_n must be at least 1, got {top_n}")
+        with self._lock:
+            self._load()
+            if not self._ids:
+                return []
+            q = _normalize(query_vec).reshape(-1)
+
+            if self.ann_min_rows and len(self._rows) >= self.ann_min_rows:
+                if self._ivf is None or len(self._rows) > 1.2 * self._ivf.built_rows:
+                    self._ivf = _IVF(self._mmap, self._rows)
+                # Rows from the probed IVF lists plus anything appended since it was built, minus deletions
+                probed = np.unique(np.concatenate([self._ivf.probe(q, self.nprobe), self._rows[self._rows > self._ivf.max_row]]))
+                probed = probed[np.isin(probed, self._rows)]
+                positions = np.searchsorted(self._rows, probed)
+                scores = self._mmap[probed] @ q
+            else:
+                positions = np.arange(len(self._rows))
+                scores = (self._mmap @ q)[self._rows]
+
+            top = np.argsort(-scores)[:top_n]
+            return [
+                {
+                    "candidate_id": self._ids[positions[i]],
+                    "resume_name": self._names[positions[i]],
+                    "score": round(float(scores[i]), 3),
+                    "added_at": self._added[positions[i]],
+                }
+                for i in top
+            ]
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self._ids)